@@ -1,10 +1,22 @@
 from __future__ import annotations
 
+import json
+import os
+import statistics
+import time
+
 import click
 from flask.cli import with_appcontext
 
 from app.extensions import db
+from app.models.recipe import Recipe
 from app.models.user import User
+from app.utils.stats import get_stats
+from utils.html_parser import available_parsers
+from utils.html_parser import extract_script_json
+from utils.html_parser import parse_html
+from utils.ingredient_parser import parse_ingredient_groups
+from utils.task_metrics import collect_task_metrics
 
 
 @click.command('create-user')
@@ -26,6 +38,138 @@ def create_db_command():
     db.session.commit()
 
 
+@click.command('pipeline-stats')
+@with_appcontext
+def pipeline_stats_command():
+    stats = get_stats()
+    for name, value in sorted(stats.items()):
+        click.echo(f"{name}: {value}")
+    hits = int(stats.get('website.structured_data.hit', 0))
+    misses = int(stats.get('website.structured_data.miss', 0))
+    if hits + misses:
+        click.echo(f"website.structured_data.share: {hits / (hits + misses):.1%}")
+
+
+@click.command('backfill-parsed-ingredients')
+@click.option('--batch-size', default=200, show_default=True)
+@click.option('--force', is_flag=True, help='Re-parse recipes that are already parsed.')
+@with_appcontext
+def backfill_parsed_ingredients_command(batch_size, force):
+    """
+    Parse the ingredients of the recipes stored before parsing moved to persist time.
+    """
+    query = Recipe.query.filter(Recipe.ingredients.isnot(None)).order_by(Recipe.id)
+    if not force:
+        query = query.filter(Recipe.parsed_ingredients.is_(None))
+    parsed = 0
+    last_id = ''
+    while True:
+        # Keyset pagination: rows leave the unparsed filter as they are committed
+        recipes = query.filter(Recipe.id > last_id).limit(batch_size).all()
+        if not recipes:
+            break
+        for recipe in recipes:
+            recipe.parsed_ingredients = parse_ingredient_groups(recipe.ingredients)
+        last_id = recipes[-1].id
+        db.session.commit()
+        parsed += len(recipes)
+        click.echo(f"{parsed} recipes parsed")
+    click.echo(f"Done, {parsed} recipes parsed.")
+
+
+def _extract(source, mode):
+    # The extractors load OpenCV, tiktoken, ... : only the benchmark commands import them
+    from extractors.recipe_extractor_website import scrape_and_analyze_recipe
+    from extractors.video_analyzer import process_video
+
+    if os.path.isfile(source):
+        recipe, _ = process_video(source, mode=mode)
+    else:
+        recipe, _, _ = scrape_and_analyze_recipe(source, mode=mode)
+    return recipe
+
+
+def _is_recipe_json(recipe) -> bool:
+    try:
+        return isinstance(json.loads(recipe), dict)
+    except (TypeError, ValueError):
+        return False
+
+
+@click.command('benchmark-extraction')
+@click.argument('sources', nargs=-1, required=True)
+@click.option('--runs', default=1, show_default=True, help='Extractions per source and mode.')
+@click.option('--mode', 'modes', multiple=True,
+              help='Mode to benchmark: structured or two_pass (repeatable, all modes by default).')
+@with_appcontext
+def benchmark_extraction_command(sources, runs, modes):
+    """
+    Compare the recipe extraction modes on website URLs or local video files.
+    """
+    from extractors.structured_recipe import EXTRACTION_MODES
+
+    unknown_modes = set(modes) - set(EXTRACTION_MODES)
+    if unknown_modes:
+        raise click.BadParameter(f"unknown modes {', '.join(sorted(unknown_modes))}, "
+                                 f"expected {', '.join(EXTRACTION_MODES)}", param_hint='--mode')
+    for source in sources:
+        for mode in modes or EXTRACTION_MODES:
+            durations, requests, tokens, valid, used_modes = [], [], [], 0, set()
+            for _ in range(runs):
+                with collect_task_metrics() as metrics:
+                    start = time.perf_counter()
+                    recipe = _extract(source, mode)
+                    durations.append(time.perf_counter() - start)
+                requests.append(metrics.get('llm.requests', 0))
+                if 'website.tokens_after' in metrics:
+                    tokens.append((metrics['website.tokens_before'], metrics['website.tokens_after']))
+                valid += _is_recipe_json(recipe)
+                used_modes.add(metrics.get('recipe.extraction_mode', '-'))
+            click.echo(
+                f"{source} [{mode}] median {statistics.median(durations):.2f}s, "
+                f"{statistics.mean(requests):.1f} LLM requests, {valid}/{runs} valid JSON, "
+                f"ran as {'/'.join(sorted(used_modes))}"
+                + (f", prompt tokens {tokens[-1][0]} -> {tokens[-1][1]}" if tokens else '')
+            )
+
+
+def _median_ms(function, runs: int) -> float:
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+@click.command('benchmark-html-parsers')
+@click.argument('pages', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--runs', default=5, show_default=True, help='Parses per page and backend.')
+@click.option('--script-id', default='__UNIVERSAL_DATA_FOR_REHYDRATION__', show_default=True,
+              help='Script tag read by the single-payload comparison.')
+@with_appcontext
+def benchmark_html_parsers_command(pages, runs, script_id):
+    """
+    Compare the HTML parser backends on saved pages: full DOM parse, and reading one script tag payload.
+    """
+    for page in pages:
+        with open(page, 'rb') as file:
+            content = file.read()
+        text = content.decode('utf-8', errors='replace')
+        results = []
+        for backend in available_parsers():
+            results.append(f"{backend} {_median_ms(lambda: parse_html(text, backend), runs):.1f}ms")
+            results.append(
+                f"{backend} script {_median_ms(lambda: parse_html(text, backend).find('script', id=script_id), runs):.1f}ms"
+            )
+        results.append(f"byte scan script {_median_ms(lambda: extract_script_json(content, script_id), runs):.2f}ms")
+        click.echo(f"{page} ({len(content) // 1024} KiB): {', '.join(results)}")
+
+
 def register(app):
     app.cli.add_command(create_user_command)
     app.cli.add_command(create_db_command)
+    app.cli.add_command(pipeline_stats_command)
+    app.cli.add_command(benchmark_extraction_command)
+    app.cli.add_command(backfill_parsed_ingredients_command)
+    app.cli.add_command(benchmark_html_parsers_command)
@@ -5,6 +5,7 @@ from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 
+import redis
 from celery import Celery
 from flask_login import LoginManager
 
@@ -17,6 +18,22 @@ db = SQLAlchemy(model_class=Base)
 migrate = Migrate()
 mail = Mail()
 login_manager = LoginManager()
+_redis_client = None
+
+
+def get_redis():
+    """
+    Shared Redis client of the process, built from REDIS_URL (or the Celery broker URL).
+    Returns None when no Redis is configured.
+    """
+    global _redis_client
+    if _redis_client is None:
+        redis_url = os.getenv('REDIS_URL') or os.getenv('CELERY_BROKER_URL')
+        if not redis_url or not redis_url.startswith(('redis://', 'rediss://')):
+            return None
+        options = {'ssl_cert_reqs': None} if redis_url.startswith('rediss://') else {}
+        _redis_client = redis.Redis.from_url(redis_url, decode_responses=True, **options)
+    return _redis_client
 
 
 def make_celery(app):
@@ -9,3 +9,4 @@ from app.models.payment import Payment
 from app.models.nutrition import Nutrition
 from app.models.payment import Subscription
 from app.models.payment import SubscriptionMembership
+from app.models.ingredient_nutrition import IngredientNutritionMemo
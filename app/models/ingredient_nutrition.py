@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime
+
+from app.extensions import db
+
+
+class IngredientNutritionMemo(db.Model):
+    """
+    Nutrients of one unit of an ingredient (e.g. 1 cup of flour), learned from past LLM analyses.
+    """
+    __tablename__ = 'ingredient_nutrition_memo'
+
+    key = db.Column(db.String(255), primary_key=True)
+    nutrients = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -14,6 +14,7 @@ class Recipe(db.Model):
     id = db.Column(db.String(255), primary_key=True, default=lambda: str(uuid.uuid4()))
     title = db.Column(db.String(255), nullable=False)
     origin = db.Column(db.String(255), nullable=False, unique=True)
+    origin_key = db.Column(db.String(255), nullable=True, index=True)
     servings = db.Column(db.Integer, nullable=True)
     created_at = db.Column(DateTime, default=datetime.utcnow, nullable=False)
 
@@ -22,6 +23,8 @@ class Recipe(db.Model):
     image_url = db.Column(db.String(256), nullable=True)
 
     ingredients = db.Column(db.JSON, nullable=True)
+    # `ingredients` parsed once at persist time: quantity, unit, name and numeric spans of every line
+    parsed_ingredients = db.Column(db.JSON, nullable=True)
     processes = db.Column(db.JSON, nullable=True)
     nutritions = db.Column(db.JSON, nullable=True)
 
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import logging
 import os
+import uuid
 
 from celery.result import AsyncResult
 from flask import abort, g
@@ -12,16 +13,19 @@ from marshmallow import ValidationError
 
 from app.decorateur.anonyme_user import load_or_create_anonymous_user
 from app.decorateur.anonyme_user import track_anonymous_requests
+from app.models import Recipe
 from app.serializers.recipe_serializer import LinkRecipeSchema
 from app.serializers.recipe_serializer import RecipeSerializer
 from app.serializers.recipe_serializer import TaskIdSchema
 from app.serializers.utils_serialiser import convert_marshmallow_to_restx_model
 from app.services.user_service import UserService
+from app.services import InflightRecipeService
 from app.services import RecipeCelService
 from app.services.usecase_logic import RecipeService
 from app.task.fetch_desciption import call_fetch_description
 from app.utils.slack_hool import send_slack_notification_recipe
 from app.utils.utils import get_current_user
+from utils.canonical_url import canonicalize_origin
 
 
 logger = logging.getLogger(__name__)
@@ -45,15 +49,44 @@ class RecipeScrap(Resource):
         try:
             link = LinkRecipeSchema().load(request.get_json())
             user, is_authenticated = get_current_user()
+            # Short links are resolved by the worker: no blocking request here
+            origin_key = canonicalize_origin(link.get('link'), resolve_short_links=False)
 
             data = {
                 'video_url': link.get('link'),
+                'origin_key': origin_key,
+                'inflight_key': origin_key,
                 'user': user.id,
                 'is_authenticated': is_authenticated
 
             }
 
-            task = call_fetch_description.delay(data)
+            # Known link: answer right away, without a task round-trip
+            recipe = RecipeService.get_recipe_by_origin(link.get('link'), origin_key=origin_key)
+            if recipe:
+                RecipeCelService.link_recipe_to_user(user.id, is_authenticated, recipe)
+                return {
+                    'task_id': None,
+                    'status': 'SUCCESS',
+                    'recipe': RecipeSerializer().dump(recipe)
+                }, 200
+
+            # The link is already being processed: wait for the same task
+            inflight_task_id = InflightRecipeService.attach(origin_key, user.id, is_authenticated)
+            if inflight_task_id:
+                return {'task_id': inflight_task_id}, 200
+
+            task_id = str(uuid.uuid4())
+            if not InflightRecipeService.claim(origin_key, task_id, user.id, is_authenticated):
+                # Another request claimed the link in the meantime
+                inflight_task_id = InflightRecipeService.attach(origin_key, user.id, is_authenticated)
+                if inflight_task_id:
+                    return {'task_id': inflight_task_id}, 200
+            try:
+                task = call_fetch_description.apply_async(args=[data], task_id=task_id)
+            except Exception:
+                InflightRecipeService.release(origin_key, task_id)
+                raise
             return {'task_id': task.id}, 200
         except ValidationError as form_ee:
             abort(400, description=form_ee.messages)
@@ -91,10 +124,21 @@ class RecipeScrapPost(Resource):
                     return fetch_result, fetch_result.pop('status')
                 # logger.error("find wes")
                 fetch_result_content = fetch_result.get('content')
-                recipe = RecipeService.get_recipe_by_origin(fetch_result_content.get('origin'))
+                origin_key = fetch_result_content.get('origin_key')
+                # The key the link was claimed under, before the worker resolved its short link
+                inflight_key = fetch_result_content.get('inflight_key') or origin_key
+                recipe = RecipeService.get_recipe_by_origin(
+                    fetch_result_content.get('origin'),
+                    origin_key=origin_key
+                )
                 if not recipe:
                     # logger.error('test of saving in a database')
                     recipe = RecipeCelService.convert_and_store_recipe(fetch_result)
+                    if not isinstance(recipe, Recipe):
+                        # Nothing was stored: let the next submission of the link start a new task
+                        InflightRecipeService.release(inflight_key, task_id)
+                        return recipe, 400
+                    InflightRecipeService.complete(inflight_key, task_id, recipe)
                     recipe = RecipeSerializer().dump(recipe)
                     app_settings = os.getenv('APP_SETTINGS')
                     if app_settings == 'app.config.ProductionConfig':
@@ -106,6 +150,7 @@ class RecipeScrapPost(Resource):
 
                     return recipe, 200
 
+                InflightRecipeService.complete(inflight_key, task_id, recipe)
                 return RecipeSerializer().dump(recipe), 200
 
             elif res.state == 'FAILURE':
@@ -18,6 +18,7 @@ from app.serializers.usecase_serializer import NutritionSchema
 from app.serializers.usecase_serializer import RecipeRequestSchema
 from app.serializers.usecase_serializer import RecipeResponseSchema
 from app.serializers.utils_serialiser import convert_marshmallow_to_restx_model
+from app.services.serving_scaler import MAX_SERVING
 from app.services.usecase_logic import RecipeService
 from app.services.user_service import UserService
 from app.utils.slack_hool import send_slack_notification_recipe
@@ -63,14 +64,17 @@ class GetRecipeResource(Resource):
         try:
             serving = request.args.get('serving', type=int)
             recipe_id = request.args.get('recipe_id', type=str)
+            if serving is not None and not 1 <= serving <= MAX_SERVING:
+                return {'error': f'serving must be between 1 and {MAX_SERVING}'}, 400
 
-            recipe = RecipeService.get_recipe_by_id(recipe_id, serving)
+            recipe = RecipeService.get_recipe_by_id(recipe_id)
 
             if not  recipe:
                 return  {"error": "recipe not found "}
+            recipe_data = RecipeSerializer().dump(recipe)
             if serving:
-                recipe.servings = serving
-            return RecipeSerializer().dump(recipe), 200
+                recipe_data.update(RecipeService.get_scaled_recipe(recipe, serving))
+            return recipe_data, 200
 
         except Exception as e:
             logger.error(f"An unexpected error occurred: {str(e)}")
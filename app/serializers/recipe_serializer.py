@@ -23,7 +23,7 @@ class RecipeSerializer(SQLAlchemyAutoSchema):
         model = Recipe
         include_relationships = True
         load_instance = True
-        exclude = ('nutritions',)
+        exclude = ('nutritions', 'parsed_ingredients')
 
     created_at = fields.DateTime(dump_only=True)  # Ensure correct serialization format
 
@@ -4,3 +4,5 @@ from app.services.user_service import UserService
 from app.services.usecase_logic import RecipeService
 from app.services.celery_recipe_service import RecipeCelService
 from app.services.anonyme_user_service import AnonymeUserService
+from app.services.inflight_service import InflightRecipeService
+from app.services.nutrition_memo_service import NutritionMemoService
@@ -18,6 +18,8 @@ from flask import request
 
 from app.services import RecipeService
 from app.utils.utils import get_current_user
+from utils.canonical_url import canonicalize_origin
+from utils.ingredient_parser import parse_ingredient_groups
 
 logger = logging.getLogger(__name__)
 
@@ -64,7 +66,10 @@ class RecipeCelService:
         """
         servings_count, servings_unit = RecipeCelService.split_serving(recipe_data.get('servings'))
         # Recherche basée sur le titre et d'autres critères pertinents
-        existing_recipe = RecipeService.get_recipe_by_origin(origin=recipe_data.get('origin'),)
+        existing_recipe = RecipeService.get_recipe_by_origin(
+            origin=recipe_data.get('origin'),
+            origin_key=recipe_data.get('origin_key')
+        )
         logger.error(f"user recipe: {existing_recipe}")
         if existing_recipe:
             return existing_recipe, False
@@ -98,7 +103,9 @@ class RecipeCelService:
             servings=servings_count,
             unit_serving=servings_unit,
             origin=recipe_data.get('origin'),
+            origin_key=recipe_data.get('origin_key') or canonicalize_origin(recipe_data.get('origin')),
             ingredients=recipe_data.get('ingredients'),
+            parsed_ingredients=parse_ingredient_groups(recipe_data.get('ingredients')),
             processes=recipe_data.get('directions'),
             nutritions=recipe_data.get('nutrition'),
         )
@@ -106,6 +113,16 @@ class RecipeCelService:
         db.session.commit()
         return recipe
 
+    @staticmethod
+    def link_recipe_to_user(user_id: str, is_authenticated: bool, recipe: Recipe):
+        """
+        Associate an existing recipe with an authenticated or anonymous user.
+        """
+        if is_authenticated:
+            return RecipeCelService.get_or_create_user_recipe(user_id, recipe.id)
+        anonymous_user, _ = RecipeCelService.get_or_create_anonyme_user(user_id)
+        return RecipeCelService.create_anonyme_user_recipe(user=anonymous_user, recipe=recipe)
+
     @staticmethod
     def create_user_recipe(user_id: int, recipe_id: int):
         user_recipe = UserRecipe(
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+
+from redis.exceptions import RedisError
+
+from app.extensions import get_redis
+from app.services.celery_recipe_service import RecipeCelService
+
+logger = logging.getLogger(__name__)
+
+INFLIGHT_RECIPE_TTL = int(os.getenv('INFLIGHT_RECIPE_TTL', 900))
+
+# Claim the link for a task and register its submitter as the first waiter, atomically
+CLAIM_SCRIPT = """
+if not redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[3]) then
+    return 0
+end
+redis.call('SADD', KEYS[2], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return 1
+"""
+
+# Attach a waiter only while the link is still owned by a task, atomically
+ATTACH_SCRIPT = """
+local task_id = redis.call('GET', KEYS[1])
+if not task_id then
+    return false
+end
+redis.call('SADD', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return task_id
+"""
+
+# Release the link (if the task still owns it) and hand back every waiter, atomically
+RELEASE_SCRIPT = """
+local task_id = redis.call('GET', KEYS[1])
+if task_id and task_id ~= ARGV[1] then
+    return {}
+end
+redis.call('DEL', KEYS[1])
+local waiters = redis.call('SMEMBERS', KEYS[2])
+redis.call('DEL', KEYS[2])
+return waiters
+"""
+
+
+class InflightRecipeService:
+    """
+    Registry of the links being processed, shared by every web and worker node through Redis.
+
+    The first submission of a link claims it with its task id; later submissions attach
+    to that task. Every waiter, the submitter included, is linked to the recipe by complete(),
+    which runs when the result of the task is first polled: a task nobody polls links no one
+    until a later submission of the link finds the stored recipe.
+    """
+
+    @staticmethod
+    def _keys(origin_key: str) -> tuple[str, str]:
+        return f'recipe:inflight:{origin_key}', f'recipe:inflight:{origin_key}:waiters'
+
+    @staticmethod
+    def claim(origin_key: str, task_id: str, user_id: str, is_authenticated: bool) -> bool:
+        """
+        Register `task_id` as the task processing the link, and its submitter as a waiter.
+        Returns False when another task already processes it.
+        """
+        client = get_redis()
+        if client is None or not origin_key:
+            return True
+        task_key, waiters_key = InflightRecipeService._keys(origin_key)
+        waiter = json.dumps({'user_id': user_id, 'is_authenticated': is_authenticated})
+        try:
+            return bool(client.eval(CLAIM_SCRIPT, 2, task_key, waiters_key, task_id, waiter, INFLIGHT_RECIPE_TTL))
+        except RedisError as e:
+            logger.error(f"Could not claim in-flight link {origin_key}: {e}")
+            return True
+
+    @staticmethod
+    def attach(origin_key: str, user_id: str, is_authenticated: bool) -> str | None:
+        """
+        Attach a user to the task already processing the link.
+
+        Returns:
+            The id of the running task, or None if the link is not being processed.
+        """
+        client = get_redis()
+        if client is None or not origin_key:
+            return None
+        task_key, waiters_key = InflightRecipeService._keys(origin_key)
+        waiter = json.dumps({'user_id': user_id, 'is_authenticated': is_authenticated})
+        try:
+            return client.eval(ATTACH_SCRIPT, 2, task_key, waiters_key, waiter, INFLIGHT_RECIPE_TTL)
+        except RedisError as e:
+            logger.error(f"Could not attach to in-flight link {origin_key}: {e}")
+            return None
+
+    @staticmethod
+    def release(origin_key: str, task_id: str) -> list[dict]:
+        """
+        Release the link and return the users that attached to the task.
+        """
+        client = get_redis()
+        if client is None or not origin_key:
+            return []
+        task_key, waiters_key = InflightRecipeService._keys(origin_key)
+        try:
+            waiters = client.eval(RELEASE_SCRIPT, 2, task_key, waiters_key, task_id)
+        except RedisError as e:
+            logger.error(f"Could not release in-flight link {origin_key}: {e}")
+            return []
+        return [json.loads(waiter) for waiter in waiters]
+
+    @staticmethod
+    def complete(origin_key: str, task_id: str, recipe) -> None:
+        """
+        Release the link and associate the recipe with every user that attached to the task.
+        """
+        for waiter in InflightRecipeService.release(origin_key, task_id):
+            try:
+                RecipeCelService.link_recipe_to_user(waiter.get('user_id'), waiter.get('is_authenticated'), recipe)
+            except Exception as e:
+                logger.error(f"Could not link recipe {recipe.id} to waiting user {waiter}: {e}")
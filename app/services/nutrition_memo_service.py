@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.ingredient_nutrition import IngredientNutritionMemo
+from app.utils.stats import increment_stat
+
+logger = logging.getLogger(__name__)
+
+
+class NutritionMemoService:
+    """
+    Memo of the nutrients learned per ingredient.
+
+    The nutrition stage runs on a StageExecutor thread, so every call opens its own short session
+    on the engine instead of using the scoped `db.session` of the request or task.
+    """
+
+    @staticmethod
+    def get_many(keys) -> dict[str, list]:
+        """
+        Memoized nutrients of the given ingredient keys; unknown keys are left out.
+        """
+        keys = set(keys)
+        if not keys:
+            return {}
+        try:
+            with Session(db.engine) as session:
+                rows = session.execute(
+                    select(IngredientNutritionMemo.key, IngredientNutritionMemo.nutrients)
+                    .where(IngredientNutritionMemo.key.in_(keys))
+                ).all()
+        except SQLAlchemyError as e:
+            logger.error(f"Nutrition memo read failed: {e}")
+            return {}
+        found = {key: nutrients for key, nutrients in rows}
+        increment_stat('nutrition_memo.hit', len(found))
+        increment_stat('nutrition_memo.miss', len(keys) - len(found))
+        return found
+
+    @staticmethod
+    def store_many(nutrients_by_key: dict[str, list]):
+        """
+        Memoize the nutrients of new ingredient keys. Keys stored meanwhile by another task are kept.
+        """
+        if not nutrients_by_key:
+            return
+        try:
+            with Session(db.engine) as session:
+                existing = set(session.scalars(
+                    select(IngredientNutritionMemo.key)
+                    .where(IngredientNutritionMemo.key.in_(nutrients_by_key.keys()))
+                ))
+                session.add_all(
+                    IngredientNutritionMemo(key=key, nutrients=nutrients)
+                    for key, nutrients in nutrients_by_key.items() if key not in existing
+                )
+                session.commit()
+        except SQLAlchemyError as e:
+            # Most likely a concurrent insert of the same key: the memo is only an optimization
+            logger.error(f"Nutrition memo write failed: {e}")
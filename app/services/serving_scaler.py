@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import event
+
+from app.models.recipe import Recipe
+from utils.ingredient_parser import parse_ingredient_groups
+
+logger = logging.getLogger(__name__)
+
+SERVING_CACHE_SIZE = int(os.getenv('SERVING_CACHE_SIZE', 2048))
+MAX_SERVING = 1000
+# Tokens and servings stay below these bounds, so scaled numerators and denominators fit in int64
+MAX_QUANTITY_TOKEN = 10 ** 12
+MAX_ORIGINAL_SERVING = 10 ** 6
+
+
+@dataclass(frozen=True)
+class QuantityVector:
+    """
+    Every numeric token of a recipe's ingredients as one rational vector, plus the text around them.
+
+    `lines[g][l]` is the (text segments, first token index) of line l of group g: the line is
+    rebuilt by interleaving its segments with its formatted tokens. A line holding a token too
+    large to scale is kept as a single segment, and never changes.
+    """
+    titles: tuple
+    texts: tuple
+    lines: tuple
+    numerators: np.ndarray
+    denominators: np.ndarray
+
+    @classmethod
+    def from_parsed(cls, parsed_ingredients) -> QuantityVector:
+        titles, texts, lines, numerators, denominators = [], [], [], [], []
+        for group in parsed_ingredients or []:
+            titles.append(group.get('title_of_ingredient'))
+            group_texts, group_lines = [], []
+            for line in group.get('list') or []:
+                text, segments, position = line['text'], [], 0
+                values = []
+                for number in line['numbers']:
+                    numerator, _, denominator = number['value'].partition('/')
+                    values.append((int(numerator), int(denominator or 1)))
+                if any(abs(value) > MAX_QUANTITY_TOKEN for pair in values for value in pair):
+                    group_texts.append(text)
+                    group_lines.append(((text,), len(numerators)))
+                    continue
+                first_token = len(numerators)
+                for number, (numerator, denominator) in zip(line['numbers'], values):
+                    segments.append(text[position:number['start']])
+                    numerators.append(numerator)
+                    denominators.append(denominator)
+                    position = number['end']
+                segments.append(text[position:])
+                group_texts.append(text)
+                group_lines.append((tuple(segments), first_token))
+            texts.append(tuple(group_texts))
+            lines.append(tuple(group_lines))
+        return cls(
+            titles=tuple(titles),
+            texts=tuple(texts),
+            lines=tuple(lines),
+            numerators=np.array(numerators, dtype=np.int64),
+            denominators=np.array(denominators, dtype=np.int64),
+        )
+
+    def scale(self, serving: int, original_serving: int) -> list[dict]:
+        """
+        Multiply every quantity by serving / original_serving in one rational pass and rebuild the groups.
+
+        At a factor of 1 the lines are returned as written ("1.5 kg" is not rewritten "1 1/2 kg").
+        """
+        if serving == original_serving:
+            return [{'title_of_ingredient': title, 'list': list(texts)} for title, texts in zip(self.titles, self.texts)]
+
+        numerators = self.numerators * serving
+        denominators = self.denominators * original_serving
+        divisors = np.gcd(numerators, denominators)
+        numerators //= divisors
+        denominators //= divisors
+        tokens = format_mixed_fractions(numerators, denominators)
+
+        groups = []
+        for title, group_lines in zip(self.titles, self.lines):
+            rebuilt = []
+            for segments, first_token in group_lines:
+                parts = [segments[0]]
+                for offset, segment in enumerate(segments[1:]):
+                    parts.append(tokens[first_token + offset])
+                    parts.append(segment)
+                rebuilt.append(''.join(parts))
+            groups.append({'title_of_ingredient': title, 'list': rebuilt})
+        return groups
+
+
+def format_mixed_fractions(numerators: np.ndarray, denominators: np.ndarray) -> list[str]:
+    """
+    Render reduced fractions as "2", "1/2" or "1 1/2" (negative ones as "-1 1/2"), the whole and
+    fractional parts computed vectorized on the absolute values.
+    """
+    signs = np.where(numerators < 0, '-', '')
+    wholes, remainders = np.divmod(np.abs(numerators), denominators)
+    return [
+        sign + (str(whole) if remainder == 0 else f"{whole} {remainder}/{denominator}" if whole else f"{remainder}/{denominator}")
+        for sign, whole, remainder, denominator
+        in zip(signs.tolist(), wholes.tolist(), remainders.tolist(), denominators.tolist())
+    ]
+
+
+def scale_unit_serving(unit_serving: str | None, serving: int, original_serving: int) -> str | None:
+    if not unit_serving:
+        return unit_serving
+    match = re.search(r'(\d+)\s*(.*)', unit_serving)
+    if not match:
+        return unit_serving
+    servings_count = int(match.group(1))
+    new_value = abs(servings_count - original_serving) + serving
+    return unit_serving.replace(str(servings_count), str(new_value), 1)
+
+
+class _LRUCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def discard_recipe(self, recipe_id: str):
+        with self._lock:
+            for key in [key for key in self._items if key[0] == recipe_id]:
+                del self._items[key]
+
+
+_vectors = _LRUCache(SERVING_CACHE_SIZE)
+_variants = _LRUCache(SERVING_CACHE_SIZE)
+
+
+def recipe_version(recipe: Recipe) -> str:
+    """
+    Hash of the fields a scaled variant is built from. It is part of the cache keys, so an edit made
+    in another process (whose update events never reach this one) can not be served from the cache.
+    """
+    fields = [recipe.ingredients, recipe.parsed_ingredients, recipe.servings, recipe.unit_serving]
+    return hashlib.blake2b(json.dumps(fields, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+def get_quantity_vector(recipe: Recipe, version: str = None) -> QuantityVector:
+    key = (recipe.id, version or recipe_version(recipe))
+    vector = _vectors.get(key)
+    if vector is None:
+        # Rows stored before parse-at-persist are parsed here, once per process
+        parsed = recipe.parsed_ingredients
+        if parsed is None:
+            parsed = parse_ingredient_groups(recipe.ingredients)
+        vector = QuantityVector.from_parsed(parsed)
+        _vectors.set(key, vector)
+    return vector
+
+
+def scaled_variant(recipe: Recipe, serving: int) -> dict:
+    """
+    The serving-dependent fields of the recipe for `serving`, memoized by (recipe id, version, serving).
+
+    The recipe itself is left untouched.
+
+    Returns:
+        dict: 'servings', 'unit_serving' and 'ingredients' for the requested serving.
+    """
+    if not 1 <= serving <= MAX_SERVING:
+        raise ValueError(f"serving must be between 1 and {MAX_SERVING}")
+    version = recipe_version(recipe)
+    key = (recipe.id, version, serving)
+    variant = _variants.get(key)
+    if variant is None:
+        original_serving = recipe.servings or 1
+        if not 1 <= original_serving <= MAX_ORIGINAL_SERVING:
+            # Not a serving count that can be scaled: keep the recipe as written
+            original_serving = serving
+        variant = {
+            'servings': serving,
+            'unit_serving': scale_unit_serving(recipe.unit_serving, serving, original_serving),
+            'ingredients': get_quantity_vector(recipe, version).scale(serving, original_serving),
+        }
+        _variants.set(key, variant)
+    return variant
+
+
+def invalidate_recipe(recipe_id: str):
+    _vectors.discard_recipe(recipe_id)
+    _variants.discard_recipe(recipe_id)
+
+
+@event.listens_for(Recipe, 'after_update')
+@event.listens_for(Recipe, 'after_delete')
+def _invalidate_on_change(mapper, connection, target):
+    invalidate_recipe(target.id)
@@ -1,12 +1,12 @@
 from __future__ import annotations
 
 import logging
-import re
-from fractions import Fraction
 
 from app.extensions import db
 from app.models.recipe import Recipe
 from app.models.user import UserRecipe
+from app.services.serving_scaler import scaled_variant
+from utils.canonical_url import canonicalize_origin
 # from sqlalchemy.exc import SQLAlchemyError
 
 logger = logging.getLogger(__name__)
@@ -15,43 +15,19 @@ logger = logging.getLogger(__name__)
 class RecipeService:
 
     @staticmethod
-    def get_recipe_by_id(recipe_id: str, serving: str = None):
+    def get_recipe_by_id(recipe_id: str):
         """
         Get a recipe with its ingredients and processes by ID.
         """
-        recipe = Recipe.query.filter_by(id=recipe_id).first()
-        if not recipe:
-            return None
-        if not serving:
-            return recipe
-
-        serving = int(serving)
-        old_serving = recipe.servings
-
-        old_ingredients = recipe.ingredients
-        new_ingredients = []
-        unit_serving = recipe.unit_serving
-        match = re.search(r'(\d+)\s*(.*)', unit_serving)
-        if match:
-            servings_count = int(match.group(1))
-            new_value = abs(servings_count - old_serving)
-            new_value += serving
-            # Extract the new value based on the position
-            update_string = unit_serving.replace(str(servings_count), str(new_value), 1)
-            recipe.unit_serving = update_string
-
-        for ingredient in old_ingredients:
-            title_of_ingredient = ingredient.get('title_of_ingredient')
-            list_ = ingredient.get('list')
-            new_list = adjust_ingredients(list_, serving, old_serving)
-            
-            new_ingredients.append({
-                'title_of_ingredient': title_of_ingredient,
-                'list': new_list
-            })
-
-        recipe.ingredients = new_ingredients
-        return recipe
+        return Recipe.query.filter_by(id=recipe_id).first()
+
+    @staticmethod
+    def get_scaled_recipe(recipe: Recipe, serving: int) -> dict:
+        """
+        Servings, unit and ingredients of the recipe adjusted to `serving`.
+        Served from a per-process cache; the recipe object is not modified.
+        """
+        return scaled_variant(recipe, int(serving))
 
     @staticmethod
     def get_all_recipes(page, page_size):
@@ -195,57 +171,17 @@ class RecipeService:
             return {'error': 'Database error occurred', 'details': str(e)}, 400
 
     @staticmethod
-    def get_recipe_by_origin(origin):
+    def get_recipe_by_origin(origin, origin_key: str = None):
         """
-        get the origin to avoid duplication in the database
+        get the origin to avoid duplication in the database.
+        The lookup uses the canonical key of the link, so tracking params, short links
+        and alternate URL forms of the same video hit the same recipe.
         """
-        origin_recipe = Recipe.query.filter_by(origin=origin).first()
-        logger.error(f'video url: {origin}')
+        origin_key = origin_key or canonicalize_origin(origin)
+        origin_recipe = Recipe.query.filter_by(origin_key=origin_key).first() if origin_key else None
+        if not origin_recipe:
+            origin_recipe = Recipe.query.filter_by(origin=origin).first()
+        logger.error(f'video url: {origin} key: {origin_key}')
         if origin_recipe:
             return origin_recipe
         return None
-
-
-def adjust_ingredients(ingredients, serving_factor, original_serving):
-    updated_ingredients = []
-
-    # Calcul du facteur d'ajustement sous forme de Fraction
-    scaling_factor = Fraction(serving_factor, original_serving)
-
-    for line in ingredients:
-        # Trouver toutes les quantités (entiers et fractions) dans la ligne
-        matches = re.findall(r'\d+\s+\d+/\d+|\d+/\d+|\d+', line)
-        if matches:
-            updated_line = line
-            for match in matches:
-                # Convertir le match en Fraction
-                if ' ' in match:  # Nombre mixte (ex : "2 1/2")
-                    whole_part, fraction_part = match.split()
-                    original_value = Fraction(int(whole_part)) + Fraction(fraction_part)
-                elif '/' in match:  # Fraction simple (ex : "1/2")
-                    original_value = Fraction(match)
-                else:  # Entier (ex : "4")
-                    original_value = Fraction(int(match))
-
-                # Ajuster la valeur selon le facteur de mise à l'échelle
-                adjusted_value = original_value * scaling_factor
-
-                # Convertir en format mixte ou garder le format Fraction
-                if adjusted_value.denominator == 1:  # Si c'est un entier
-                    adjusted_value_str = str(adjusted_value.numerator)
-                elif adjusted_value.numerator > adjusted_value.denominator:  # Nombre mixte
-                    whole_part = adjusted_value.numerator // adjusted_value.denominator
-                    fractional_part = Fraction(adjusted_value.numerator % adjusted_value.denominator, adjusted_value.denominator)
-                    adjusted_value_str = f"{whole_part} {fractional_part}"
-                else:  # Fraction propre
-                    adjusted_value_str = str(adjusted_value)
-
-                # Remplacer dans la ligne d'ingrédient
-                updated_line = updated_line.replace(match, adjusted_value_str, 1)
-
-            updated_ingredients.append(updated_line)
-        else:
-            # Si aucune quantité n'est trouvée, ajouter la ligne telle quelle
-            updated_ingredients.append(line)
-
-    return updated_ingredients
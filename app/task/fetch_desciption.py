@@ -6,10 +6,12 @@ from celery.signals import task_failure
 from celery.utils.log import get_task_logger
 
 from app.serializers.recipe_serializer import RecipeSerializer
-from app.services import RecipeCelService, AnonymeUserService
+from app.services import RecipeCelService, AnonymeUserService, InflightRecipeService
 from app.services.usecase_logic import RecipeService
 from app.utils.utils import get_current_user
 from extractors import fetch_description
+from utils.canonical_url import canonicalize_origin
+from utils.task_metrics import collect_task_metrics
 
 logger = get_task_logger(__name__)
 
@@ -30,14 +32,16 @@ def call_fetch_description(self, data):
         existing_data = data.get('video_url')
         user_id = data.get('user')
         is_authenticated = data.get('is_authenticated')
-        description_result = RecipeService.get_recipe_by_origin(origin=existing_data)
+        # Resolve the link to its canonical key before anything gets downloaded: short links are
+        # followed here, the web request claimed the link under its unresolved key
+        inflight_key = data.get('inflight_key') or data.get('origin_key')
+        origin_key = canonicalize_origin(existing_data)
+        data['origin_key'] = origin_key
+        data['inflight_key'] = inflight_key
+        description_result = RecipeService.get_recipe_by_origin(origin=existing_data, origin_key=origin_key)
         if description_result:
-
-            if is_authenticated:
-                RecipeCelService.get_or_create_user_recipe(user_id, description_result.id)
-            else:
-                anonymous_user, is_exist = RecipeCelService.get_or_create_anonyme_user(user_id)
-                RecipeCelService.create_anonyme_user_recipe(user=anonymous_user, recipe=description_result)
+            RecipeCelService.link_recipe_to_user(user_id, is_authenticated, description_result)
+            InflightRecipeService.complete(inflight_key, self.request.id, description_result)
 
             return {
                 'status': 'success',
@@ -46,12 +50,18 @@ def call_fetch_description(self, data):
                         'content': RecipeSerializer().dump(description_result)
                     }
                 }
-        description_result = fetch_description(data)
+        with collect_task_metrics() as metrics:
+            description_result = fetch_description(data)
+        logger.info(f"fetch_description metrics for {existing_data}: {metrics}")
+        if not description_result or description_result.get('error'):
+            # Nothing will be stored: let the next submission of the link start a new task
+            InflightRecipeService.release(inflight_key, self.request.id)
 
         return {
             'status': 'success',
             'find': False,
-            'result': description_result
+            'result': description_result,
+            'metrics': metrics
         }
 
     except Exception as exc:
@@ -61,6 +71,7 @@ def call_fetch_description(self, data):
             # Retry the task
             self.retry(exc=exc)
         except MaxRetriesExceededError as mascExs:
+            InflightRecipeService.release(data.get('inflight_key') or data.get('origin_key'), self.request.id)
             return {'error': f"Error in fetch_description task: {str(exc)} after retrying {str(mascExs)}"}
 
 
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import zlib
+
+import requests
+from redis.exceptions import RedisError
+from requests.structures import CaseInsensitiveDict
+
+from app.extensions import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Cached pages are kept for PAGE_CACHE_TTL seconds; younger than PAGE_CACHE_FRESH_SECONDS they are served
+# without any request, older ones are revalidated with If-None-Match / If-Modified-Since
+PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', 7 * 24 * 3600))
+PAGE_CACHE_FRESH_SECONDS = int(os.getenv('PAGE_CACHE_FRESH_SECONDS', 900))
+PAGE_CACHE_MAX_BYTES = int(os.getenv('PAGE_CACHE_MAX_BYTES', 5 * 1024 * 1024))
+# Used when no Redis is configured, least recently stored pages evicted above PAGE_CACHE_DIR_MAX_BYTES
+PAGE_CACHE_DIR = os.getenv('PAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'chefmode_page_cache'))
+PAGE_CACHE_DIR_MAX_BYTES = int(os.getenv('PAGE_CACHE_DIR_MAX_BYTES', 200 * 1024 * 1024))
+PAGE_CACHE_KEY_PREFIX = 'chefmode:page_cache:'
+CACHED_HEADERS = ('content-type', 'etag', 'last-modified')
+
+
+def _key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def _cache_file(url: str) -> str:
+    return os.path.join(PAGE_CACHE_DIR, f'{_key(url)}.json')
+
+
+def get_cached_page(url: str) -> dict | None:
+    """
+    The cache entry of the page, or None.
+    """
+    client = get_redis()
+    if client is not None:
+        try:
+            raw = client.get(PAGE_CACHE_KEY_PREFIX + _key(url))
+            return json.loads(raw) if raw else None
+        except RedisError as e:
+            logger.error(f"Could not read cached page {url}: {e}")
+            return None
+    cache_file = _cache_file(url)
+    try:
+        with open(cache_file) as file:
+            entry = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry['stored_at'] > PAGE_CACHE_TTL:
+        _remove(cache_file)
+        return None
+    return entry
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _evict():
+    """
+    Remove the expired pages, then the oldest ones until the directory fits in PAGE_CACHE_DIR_MAX_BYTES.
+    """
+    files = []
+    with os.scandir(PAGE_CACHE_DIR) as entries:
+        for entry in entries:
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+    files.sort()
+    expired_before = time.time() - PAGE_CACHE_TTL
+    total_size = sum(size for _, size, _ in files)
+    for modified_at, size, path in files:
+        if modified_at >= expired_before and total_size <= PAGE_CACHE_DIR_MAX_BYTES:
+            break
+        _remove(path)
+        total_size -= size
+
+
+def _write(url: str, entry: dict):
+    raw = json.dumps(entry)
+    client = get_redis()
+    if client is not None:
+        try:
+            client.set(PAGE_CACHE_KEY_PREFIX + _key(url), raw, ex=PAGE_CACHE_TTL)
+        except RedisError as e:
+            logger.error(f"Could not cache page {url}: {e}")
+        return
+    try:
+        os.makedirs(PAGE_CACHE_DIR, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=PAGE_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w') as file:
+            file.write(raw)
+        os.replace(temp_path, _cache_file(url))
+        _evict()
+    except OSError as e:
+        logger.error(f"Could not cache page {url}: {e}")
+
+
+def is_fresh(entry: dict) -> bool:
+    return time.time() - entry['stored_at'] < PAGE_CACHE_FRESH_SECONDS
+
+
+def conditional_headers(entry: dict | None) -> dict:
+    """
+    The validators of the cached page, to make the next request conditional.
+    """
+    if not entry:
+        return {}
+    headers = {}
+    if entry['headers'].get('etag'):
+        headers['If-None-Match'] = entry['headers']['etag']
+    if entry['headers'].get('last-modified'):
+        headers['If-Modified-Since'] = entry['headers']['last-modified']
+    return headers
+
+
+def store_page(url: str, response: requests.Response, validators: bool = True):
+    """
+    Cache a successful response: its body zlib-compressed, with its validators unless `validators` is
+    False (a page relayed by a scraping API carries the API's headers, not the site's).
+    """
+    cache_control = response.headers.get('cache-control', '').lower()
+    if response.status_code != 200 or 'no-store' in cache_control or len(response.content) > PAGE_CACHE_MAX_BYTES:
+        return
+    _write(url, {
+        'url': response.url or url,
+        'encoding': response.encoding,
+        'headers': {
+            name: response.headers[name]
+            for name in CACHED_HEADERS
+            if name in response.headers and (validators or name == 'content-type')
+        },
+        'body': base64.b64encode(zlib.compress(response.content)).decode(),
+        'stored_at': time.time(),
+    })
+
+
+def refresh_page(url: str, entry: dict, response: requests.Response):
+    """
+    The page was not modified (304): restart its freshness, taking the new validators if any.
+    """
+    for name in ('etag', 'last-modified'):
+        if response.headers.get(name):
+            entry['headers'][name] = response.headers[name]
+    entry['stored_at'] = time.time()
+    _write(url, entry)
+
+
+def cached_response(entry: dict) -> requests.Response:
+    """
+    Rebuild the requests.Response of a cached page.
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = 'OK'
+    response.url = entry['url']
+    response.encoding = entry['encoding']
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response._content = zlib.decompress(base64.b64decode(entry['body']))
+    return response
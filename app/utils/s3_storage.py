@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import logging
 import os
+import tempfile
 
 import boto3
 import cv2
@@ -88,13 +89,17 @@ def save_image_to_s3_from_url(image_url, s3_file_name):
     image = load_image_from_url(image_url)
 
     if image is not None:
-        # Sauvegarder l'image localement
-        local_file_path = 'temp_image.jpg'
-        cv2.imwrite(local_file_path, image)
-        logger.info(f"Image sauvegardée localement : {local_file_path}")
-
-        # Uploader l'image sur S3
-        return upload_to_s3(local_file_path, s3_file_name)
+        # Sauvegarder l'image localement, dans un fichier propre à cet appel
+        file_descriptor, local_file_path = tempfile.mkstemp(suffix='.jpg')
+        os.close(file_descriptor)
+        try:
+            cv2.imwrite(local_file_path, image)
+            logger.info(f"Image sauvegardée localement : {local_file_path}")
+
+            # Uploader l'image sur S3
+            return upload_to_s3(local_file_path, s3_file_name)
+        finally:
+            os.remove(local_file_path)
     else:
         logger.info("Échec du chargement de l'image.")
         return None
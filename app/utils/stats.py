@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import Counter
+
+from redis.exceptions import RedisError
+
+from app.extensions import get_redis
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = 'chefmode:pipeline_stats'
+
+# Used when no Redis is configured: counts of this process only
+_local_stats = Counter()
+_local_lock = threading.Lock()
+
+
+def increment_stat(name: str, amount: int = 1) -> None:
+    """
+    Increment a pipeline counter shared by every worker (cache hits, fast paths, ...).
+    """
+    client = get_redis()
+    if client is not None:
+        try:
+            client.hincrby(STATS_KEY, name, amount)
+            return
+        except RedisError as e:
+            logger.error(f"Could not increment stat {name}: {e}")
+    with _local_lock:
+        _local_stats[name] += amount
+
+
+def get_stats() -> dict:
+    """
+    Current value of every pipeline counter.
+    """
+    client = get_redis()
+    if client is not None:
+        try:
+            return {name: int(value) for name, value in client.hgetall(STATS_KEY).items()}
+        except RedisError as e:
+            logger.error(f"Could not read pipeline stats: {e}")
+    with _local_lock:
+        return dict(_local_stats)
@@ -7,18 +7,20 @@ import time
 import uuid
 
 
+from app.utils.s3_storage import save_image_to_s3_from_url
 from app.utils.s3_storage import upload_to_s3
 from extractors.facebook import download_facebook_video
 from extractors.instagram import download_instagram_video
 # from extractors.new_tiktok import download_video_new_tiktok
 from extractors.new_youtube import download_youtube
-from extractors.recipe_extractor_website import analyse_nutrition_base_ingredient
+from extractors.nutrition_engine import analyse_recipe_nutrition
 from extractors.recipe_extractor_website import scrape_and_analyze_recipe
 from extractors.tiktok import download_tiktok
 from extractors.video_analyzer import process_video
 from extractors.x_scraper import download_twitter_video
 from extractors.youtube import download_youtube_video
 from utils.common import identify_platform
+from utils.pipeline import StageExecutor
 from utils.settings import BASE_DIR
 
 
@@ -26,6 +28,9 @@ logger = logging.getLogger(__name__)
 # Constants
 DOWNLOAD_FOLDER = BASE_DIR / 'downloads'
 SLEEP_TIME = 2
+# Single deadline for the trailing stages (nutrition, image upload, cleanup)
+FINALIZE_DEADLINE_SECONDS = float(os.getenv('FINALIZE_DEADLINE_SECONDS', 120))
+FINALIZE_WORKERS = 3
 
 
 def ensure_download_folder_exists():
@@ -72,37 +77,48 @@ def fetch_description(request_data):
             'facebook': download_facebook_video
         }
 
+        video_path = None
         if platform in download_functions:
             # Download the video
-            video_url_with_audio = download_functions[platform](video_url)
-            logger.error(video_url_with_audio)
+            video_path = download_functions[platform](video_url)
+            logger.error(video_path)
             # Wait for the download to complete
             time.sleep(SLEEP_TIME)
-            if not video_url_with_audio:
+            if not video_path:
                 return {'error': 'video recipe not found ', 'status': 404}
             # Process the video
-            recipe, image_url_to_store = retry_process_video(video_url_with_audio)
-            s3_file_name = f'{uuid.uuid4()}_image.jpg'
-            image_url = upload_to_s3(image_url_to_store, s3_file_name)
-
-            # Remove the downloaded video after processing
-            remove_file(video_url_with_audio)
-            remove_file(image_url_to_store)
-
+            recipe, image_source = retry_process_video(video_path)
+            upload_image = upload_recipe_image
         elif platform == 'website':
-            recipe, got_image, image_url = scrape_and_analyze_recipe(video_url)
+            recipe, got_image, image_source = scrape_and_analyze_recipe(video_url, upload_image=False)
+            upload_image = save_image_to_s3_from_url
         if not recipe:
+            if video_path:
+                remove_files(video_path, image_source)
             return {'error': 'recipe not found', 'status': 404}
 
-        recipe_info = json.loads(recipe)
-
-        nutrition = analyse_nutrition_base_ingredient(recipe)
-        nutrition_json = json.loads(nutrition)
-        logger.info(nutrition_json['nutritions'])
-        recipe_info['nutrition'] = nutrition_json['nutritions']
+        try:
+            recipe_info = json.loads(recipe)
+        except json.JSONDecodeError:
+            if video_path:
+                remove_files(video_path, image_source)
+            raise
+
+        # Nutrition, image upload and cleanup only depend on the recipe: fan them out under one deadline
+        with StageExecutor(max_workers=FINALIZE_WORKERS, name='finalize_recipe') as stages:
+            stages.submit('nutrition', analyse_recipe_nutrition, recipe)
+            stages.submit('image', upload_image, image_source, f'{uuid.uuid4()}_image.jpg')
+            if video_path:
+                stages.submit('cleanup', remove_file, video_path)
+            results = stages.gather(timeout=FINALIZE_DEADLINE_SECONDS)
+
+        recipe_info['nutrition'] = parse_nutrition(results['nutrition'])
+        image_url = results['image']
         logger.info(image_url)
         recipe_info['image_url'] = image_url
         recipe_info['origin'] = video_url
+        recipe_info['origin_key'] = request_data.get('origin_key')
+        recipe_info['inflight_key'] = request_data.get('inflight_key')
         logger.info(json.loads(recipe))
         logger.error(f"recipe_info { recipe_info}")
         final_content = {
@@ -119,6 +135,33 @@ def fetch_description(request_data):
     return None
 
 
+def upload_recipe_image(image_path, s3_file_name):
+    """
+    Upload the image extracted from the video, then delete the local copy.
+    """
+    try:
+        return upload_to_s3(image_path, s3_file_name)
+    finally:
+        remove_file(image_path)
+
+
+def parse_nutrition(nutrition) -> list:
+    if not nutrition:
+        return []
+    try:
+        nutrition_json = json.loads(nutrition)
+        logger.info(nutrition_json['nutritions'])
+        return nutrition_json['nutritions']
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        logger.error(f"An error occurred while decoding the nutrition: {e}")
+        return []
+
+
+def remove_files(*file_paths):
+    for file_path in file_paths:
+        remove_file(file_path)
+
+
 def remove_file(file_path_to_remove):
-    if os.path.exists(file_path_to_remove):
+    if file_path_to_remove and os.path.exists(file_path_to_remove):
         os.remove(file_path_to_remove)
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import logging
+import re
+
+from bs4 import NavigableString
+from bs4.element import PreformattedString
+
+logger = logging.getLogger(__name__)
+
+# Never text
+NON_TEXT_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe']
+# Page furniture, removed unless it wraps the content (forms are not: ASP.NET pages wrap everything in one)
+UNLIKELY_TAGS = ['button', 'input', 'select', 'textarea', 'nav', 'footer', 'header', 'aside']
+NEGATIVE_REGEX = re.compile(
+    r'comment|footer|footnote|masthead|menu|nav|sidebar|share|sharing|social|related|recommend|advert|\bads?\b|'
+    r'sponsor|promo|newsletter|subscribe|signup|cookie|consent|popup|modal|breadcrumb|widget|banner|outbrain|taboola',
+    re.IGNORECASE,
+)
+POSITIVE_REGEX = re.compile(r'recipe|ingredient|instruction|direction|method|step|content|article|main|entry|post',
+                            re.IGNORECASE)
+WHITESPACE_REGEX = re.compile(r'\s+')
+RECIPE_REGEX = re.compile(r'recipe|ingredient|instruction|direction|method', re.IGNORECASE)
+PARAGRAPH_TAGS = ['p', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'td', 'pre', 'blockquote', 'dd']
+CANDIDATE_TAGS = {'div', 'article', 'section', 'main', 'td', 'ul', 'ol', 'table', 'body'}
+BLOCK_TAGS = {'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure',
+              'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'main', 'ol', 'p', 'pre', 'section', 'table', 'td',
+              'th', 'tr', 'ul'}
+MIN_PARAGRAPH_LENGTH = 20
+SIBLING_SCORE_RATIO = 0.2
+MIN_CONTENT_LENGTH = 500
+# A block holding more than this share of the page text is a wrapper, whatever its tag or class says
+WRAPPER_TEXT_SHARE = 0.5
+
+
+def _attribute_text(element) -> str:
+    classes = element.get('class') or []
+    return ' '.join([*classes, element.get('id') or ''])
+
+
+def _class_weight(element) -> float:
+    attributes = _attribute_text(element)
+    if not attributes:
+        return 0.0
+    weight = 0.0
+    if NEGATIVE_REGEX.search(attributes):
+        weight -= 25
+    if POSITIVE_REGEX.search(attributes):
+        weight += 25
+    if RECIPE_REGEX.search(attributes):
+        weight += 25
+    return weight
+
+
+def _link_density(element) -> float:
+    text_length = len(element.get_text(strip=True))
+    if not text_length:
+        return 0.0
+    link_length = sum(len(link.get_text(strip=True)) for link in element.find_all('a'))
+    return link_length / text_length
+
+
+def remove_non_text(soup):
+    for element in soup.find_all(NON_TEXT_TAGS):
+        element.decompose()
+
+
+def _is_wrapper(element, page_length: int) -> bool:
+    if element.find(attrs={'class': RECIPE_REGEX}) is not None:
+        return True
+    return len(element.get_text()) > page_length * WRAPPER_TEXT_SHARE
+
+
+def remove_boilerplate(soup):
+    """
+    Drop the page furniture tags and the blocks whose class or id marks them as boilerplate,
+    except the ones wrapping recipe blocks or most of the page text.
+    """
+    remove_non_text(soup)
+    page_length = len(soup.get_text())
+    for element in soup.find_all(UNLIKELY_TAGS):
+        if not element.decomposed and not _is_wrapper(element, page_length):
+            element.decompose()
+    for element in soup.find_all(True):
+        if element.decomposed or element.name in ('html', 'body'):
+            continue
+        attributes = _attribute_text(element)
+        if (attributes and NEGATIVE_REGEX.search(attributes) and not POSITIVE_REGEX.search(attributes)
+                and not _is_wrapper(element, page_length)):
+            element.decompose()
+
+
+def score_candidates(soup) -> dict:
+    """
+    Text-density scores of the containers: every paragraph gives its parent a score based on its length
+    and commas, and half of it to its grandparent, then containers are weighted by class and link density.
+
+    Returns:
+        dict: id of the container -> (container, score). Tags compare by content, so they are keyed by id.
+    """
+    scores = {}
+    for paragraph in soup.find_all(PARAGRAPH_TAGS):
+        text = paragraph.get_text(' ', strip=True)
+        if len(text) < MIN_PARAGRAPH_LENGTH and paragraph.name != 'li':
+            continue
+        content_score = 1 + text.count(',') + min(len(text) // 100, 3)
+        ancestors = [parent for parent in paragraph.parents if parent.name in CANDIDATE_TAGS][:2]
+        for level, ancestor in enumerate(ancestors):
+            if id(ancestor) not in scores:
+                scores[id(ancestor)] = [ancestor, _class_weight(ancestor)]
+            scores[id(ancestor)][1] += content_score / (level + 1)
+    return {
+        key: (element, score * (1 - _link_density(element)))
+        for key, (element, score) in scores.items()
+    }
+
+
+def _contains(ancestor, element) -> bool:
+    return any(parent is ancestor for parent in element.parents)
+
+
+def block_text(element) -> str:
+    """
+    Text of the element with one line per block: inline tags (span, a, b...) stay inside their line.
+    """
+    parts = []
+    for node in element.descendants:
+        if isinstance(node, NavigableString):
+            # Comments, CDATA and doctypes are not text
+            if not isinstance(node, PreformattedString):
+                parts.append(WHITESPACE_REGEX.sub(' ', str(node)))
+        elif node.name in BLOCK_TAGS:
+            parts.append('\n')
+    return ''.join(parts)
+
+
+def _dedupe_lines(texts: list[str]) -> list[str]:
+    """
+    Lines of the texts, without the lines already seen in a previous text (a list of ingredients
+    written in the post and again in the recipe card). Repeats within a text are kept.
+    """
+    lines = []
+    seen = set()
+    for text in texts:
+        text_lines = [line.strip() for line in text.splitlines()]
+        text_lines = [line for line in text_lines if line and line not in seen]
+        lines.extend(text_lines)
+        seen.update(text_lines)
+    return lines
+
+
+def extract_page_text(soup) -> str:
+    """
+    Text of the whole page, one line per block, without scripts and styles.
+
+    Note: the soup is modified (the non-text tags are removed).
+    """
+    remove_non_text(soup)
+    return '\n'.join(_dedupe_lines([block_text(soup.body or soup)]))
+
+
+def _fallback_text(body, page_text: str) -> str:
+    """
+    Text of the whole page without its boilerplate, or with it when the removal took most of the page.
+    """
+    text = '\n'.join(_dedupe_lines([block_text(body)]))
+    if len(text) < len(page_text) * WRAPPER_TEXT_SHARE:
+        logger.info('Boilerplate removal kept too little text, keeping the whole page')
+        return page_text
+    return text
+
+
+def extract_main_content(soup, page_text: str = None) -> str:
+    """
+    Readability-style extraction of the main text of the page.
+
+    Boilerplate blocks are removed, the best scoring container is kept with its sibling blocks that
+    score close to it, and recipe blocks (ingredients, instructions) found elsewhere are added. The
+    text of each kept block is read once, so nested tags are never repeated. When too little is
+    kept, the text of the whole page is returned instead, falling back to `page_text` (read before
+    any removal) if the boilerplate removal took most of it.
+
+    Note: the soup is modified.
+    """
+    if page_text is None:
+        page_text = extract_page_text(soup)
+    remove_boilerplate(soup)
+    body = soup.body or soup
+    scores = score_candidates(body)
+    if not scores:
+        return _fallback_text(body, page_text)
+
+    top, top_score = max(scores.values(), key=lambda candidate: candidate[1])
+    threshold = max(10.0, top_score * SIBLING_SCORE_RATIO)
+    blocks = [top]
+    if top.parent is not None:
+        blocks = [sibling for sibling in top.parent.find_all(recursive=False)
+                  if sibling is top or scores.get(id(sibling), (None, 0))[1] >= threshold]
+    for element in body.find_all(attrs={'class': RECIPE_REGEX}):
+        if not any(block is element or _contains(block, element) for block in blocks):
+            blocks = [block for block in blocks if not _contains(element, block)] + [element]
+
+    content = '\n'.join(_dedupe_lines([block_text(block) for block in blocks]))
+    if len(content) < MIN_CONTENT_LENGTH:
+        logger.info('Main content too short, keeping the text of the whole page')
+        return _fallback_text(body, page_text)
+    return content
@@ -3,6 +3,9 @@ import logging
 import requests
 
 from utils.common import save_video_to_file
+from utils.downloader import DownloadTooLargeError
+from utils.downloader import remove_scratch_file
+from utils.downloader import stream_download
 
 logger = logging.getLogger(__name__)
 
@@ -34,12 +37,14 @@ def download_facebook_video(url):
         return
 
     # Step 5: Download the MP4 video
+    scratch_path = None
     try:
-        video_response = requests.get(video_url, stream=True)
-        if video_response.status_code != 200:
-            logger.info("Failed to download the video.")
-            return None
-        video_buffer = video_response.content
-        return save_video_to_file(video_buffer)
+        scratch_path = stream_download(video_url)
+        return save_video_to_file(scratch_path)
+    except DownloadTooLargeError as e:
+        logger.info(f"Video rejected, too large: {e}")
+        return None
     except Exception as e:
         logger.info(f"Error downloading video: {e}")
+    finally:
+        remove_scratch_file(scratch_path)
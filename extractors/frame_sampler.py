@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import base64
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import ffmpeg
+import numpy as np
+
+from utils.task_metrics import record_metric
+
+logger = logging.getLogger(__name__)
+
+MAX_FRAMES = int(os.getenv('MAX_VIDEO_FRAMES', 60))
+MIN_FRAMES = int(os.getenv('MIN_VIDEO_FRAMES', 4))
+SCENE_SAMPLE_FPS = float(os.getenv('SCENE_SAMPLE_FPS', 2))
+SCENE_DECODE_MAX_SIDE = int(os.getenv('SCENE_DECODE_MAX_SIDE', 768))
+SCENE_MIN_SCORE = float(os.getenv('SCENE_MIN_SCORE', 0.08))
+SCORE_THUMBNAIL_SIZE = (64, 36)
+HISTOGRAM_BINS = 32
+HASH_SIZE = 8
+FRAME_HASH_MAX_DISTANCE = int(os.getenv('FRAME_HASH_MAX_DISTANCE', 6))
+# Frames are sent with `detail: low`, which OpenAI downsamples to 512px anyway
+FRAME_ENCODE_MAX_SIDE = int(os.getenv('FRAME_ENCODE_MAX_SIDE', 512))
+FRAME_JPEG_QUALITY = int(os.getenv('FRAME_JPEG_QUALITY', 70))
+FRAME_ENCODE_WORKERS = int(os.getenv('FRAME_ENCODE_WORKERS', 4))
+
+
+class FrameDecodingError(Exception):
+    pass
+
+
+def decode_size(media_info, max_side: int = SCENE_DECODE_MAX_SIDE) -> tuple[int, int] | None:
+    """
+    Size (even width and height) at which frames are decoded for scene detection.
+    """
+    display_size = media_info.display_size
+    if not display_size:
+        return None
+    width, height = display_size
+    scale = min(1.0, max_side / max(width, height))
+    return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+
+def iter_decoded_frames(video_path, width: int, height: int, fps: float = SCENE_SAMPLE_FPS):
+    """
+    Decode the video sequentially with ffmpeg at a reduced frame rate and resolution.
+
+    Yields:
+        tuple: (timestamp in seconds, BGR frame as a NumPy array).
+
+    Raises:
+        FrameDecodingError: ffmpeg exited with an error once every frame was read.
+    """
+    process = (
+        ffmpeg
+        .input(str(video_path))
+        .filter('fps', fps=fps)
+        .filter('scale', width, height)
+        .output('pipe:', format='rawvideo', pix_fmt='bgr24')
+        .global_args('-loglevel', 'error')
+        .run_async(pipe_stdout=True)
+    )
+    frame_size = width * height * 3
+    index = 0
+    exhausted = False
+    try:
+        while True:
+            buffer = process.stdout.read(frame_size)
+            if len(buffer) < frame_size:
+                exhausted = True
+                break
+            yield index / fps, np.frombuffer(buffer, np.uint8).reshape(height, width, 3)
+            index += 1
+    finally:
+        process.stdout.close()
+        return_code = process.wait()
+    # A consumer stopping early closes the pipe, which makes ffmpeg fail: only a full read is checked
+    if exhausted and return_code != 0:
+        raise FrameDecodingError(f"ffmpeg exited with code {return_code} after {index} frames")
+
+
+def _thumbnail(frame) -> np.ndarray:
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, SCORE_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def _histogram(thumbnail) -> np.ndarray:
+    counts = np.bincount((thumbnail >> 3).ravel(), minlength=HISTOGRAM_BINS)
+    return counts / thumbnail.size
+
+
+def scene_change_score(thumbnail, histogram, previous_thumbnail, previous_histogram) -> float:
+    """
+    Difference between two consecutive frames, in [0, 1]: mean of the pixel delta and the histogram delta.
+    """
+    pixel_delta = np.abs(thumbnail.astype(np.int16) - previous_thumbnail.astype(np.int16)).mean() / 255
+    histogram_delta = 0.5 * np.abs(histogram - previous_histogram).sum()
+    return float(0.5 * pixel_delta + 0.5 * histogram_delta)
+
+
+def select_scene_frames(video_path, media_info, max_frames: int = MAX_FRAMES) -> list[np.ndarray] | None:
+    """
+    Keep up to `max_frames` frames at the scene boundaries of the video.
+
+    The video is split in `max_frames` equal windows; in each window the frame that differs the most
+    from the previous one is a candidate, and candidates of static windows are dropped.
+
+    Returns:
+        list: The selected frames in chronological order, or None if the video cannot be decoded.
+    """
+    size = decode_size(media_info)
+    duration = media_info.video_duration
+    if not size or not duration:
+        return None
+
+    window_length = max(duration / max_frames, 1 / SCENE_SAMPLE_FPS)
+    candidates = {}
+    previous = None
+    decoded = 0
+    try:
+        for timestamp, frame in iter_decoded_frames(video_path, *size):
+            decoded += 1
+            thumbnail = _thumbnail(frame)
+            histogram = _histogram(thumbnail)
+            score = 1.0 if previous is None else scene_change_score(thumbnail, histogram, *previous)
+            previous = (thumbnail, histogram)
+
+            window = min(int(timestamp / window_length), max_frames - 1)
+            if window not in candidates or score > candidates[window][0]:
+                candidates[window] = (score, frame)
+    except FrameDecodingError as e:
+        logger.error(f"Sequential decoding failed for {video_path}: {e}")
+        return None
+    if not candidates:
+        return None
+
+    ranked = sorted(candidates.items(), key=lambda item: item[1][0], reverse=True)
+    kept = {window for window, (score, _) in ranked if score >= SCENE_MIN_SCORE}
+    for window, _ in ranked:
+        if len(kept) >= MIN_FRAMES:
+            break
+        kept.add(window)
+
+    frames = [candidates[window][1] for window in sorted(kept)]
+    logger.info(f"Scene selection kept {len(frames)} of {decoded} decoded frames")
+    record_metric('frames.decoded', decoded)
+    record_metric('frames.scene_selected', len(frames))
+    return frames
+
+
+def dhash_batch(frames) -> np.ndarray:
+    """
+    Difference hash of every frame: 64 bits comparing horizontally adjacent pixels of a 9x8 thumbnail.
+
+    Returns:
+        np.ndarray: (number of frames, 8) array of packed hash bytes.
+    """
+    thumbnails = np.stack([
+        cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+        for frame in frames
+    ]).astype(np.int16)
+    bits = thumbnails[:, :, 1:] > thumbnails[:, :, :-1]
+    return np.packbits(bits.reshape(len(frames), -1), axis=1)
+
+
+def hamming_distances(hashes) -> np.ndarray:
+    """
+    Pairwise Hamming distance matrix of packed hashes.
+    """
+    return np.unpackbits(hashes[:, None, :] ^ hashes[None, :, :], axis=2).sum(axis=2)
+
+
+def deduplicate_frames(frames, max_distance: int = FRAME_HASH_MAX_DISTANCE) -> list[np.ndarray]:
+    """
+    Drop the frames whose perceptual hash is within `max_distance` bits of an already kept frame.
+    """
+    if len(frames) < 2:
+        return list(frames)
+    distances = hamming_distances(dhash_batch(frames))
+    kept = [0]
+    for index in range(1, len(frames)):
+        if (distances[index, kept] > max_distance).all():
+            kept.append(index)
+
+    dropped = len(frames) - len(kept)
+    logger.info(f"Perceptual hash deduplication dropped {dropped} of {len(frames)} frames")
+    record_metric('frames.hash_dropped', dropped)
+    return [frames[index] for index in kept]
+
+
+def encode_frame(frame, max_side: int = FRAME_ENCODE_MAX_SIDE, quality: int = FRAME_JPEG_QUALITY) -> str:
+    """
+    Resize the frame to the analysis resolution and encode it as a base64 JPEG.
+    """
+    height, width = frame.shape[:2]
+    scale = max_side / max(width, height)
+    if scale < 1:
+        frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return base64.b64encode(buffer).decode('utf-8')
+
+
+def encode_frames(frames, max_side: int = FRAME_ENCODE_MAX_SIDE, quality: int = FRAME_JPEG_QUALITY,
+                  workers: int = FRAME_ENCODE_WORKERS) -> list[str]:
+    """
+    Encode the frames on a thread pool (cv2 releases the GIL while resizing and encoding).
+
+    Returns:
+        list: The base64 JPEG of every frame, in order.
+    """
+    if not frames:
+        return []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='encode_frames') as pool:
+        encoded = list(pool.map(lambda frame: encode_frame(frame, max_side, quality), frames))
+
+    payload_bytes = sum(len(frame) for frame in encoded)
+    logger.info(f"Encoded {len(encoded)} frames ({payload_bytes} base64 bytes) in {time.perf_counter() - start:.3f}s")
+    record_metric('frames.encoded', len(encoded))
+    record_metric('frames.payload_bytes', payload_bytes)
+    return encoded
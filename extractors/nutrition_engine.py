@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import re
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.services.nutrition_memo_service import NutritionMemoService
+from extractors.recipe_extractor_website import analyse_nutrition_base_ingredient
+from extractors.recipe_extractor_website import analyse_nutrition_per_ingredient
+from utils.ingredient_parser import MASS_UNITS
+from utils.ingredient_parser import normalize_ingredient_name
+from utils.ingredient_parser import parse_ingredient
+from utils.ingredient_parser import ParsedIngredient
+from utils.ingredient_parser import VOLUME_UNITS
+from utils.settings import BASE_DIR
+from utils.task_metrics import record_metric
+
+logger = logging.getLogger(__name__)
+
+FOOD_COMPOSITION_CSV = BASE_DIR / 'extractors' / 'data' / 'food_composition.csv'
+# Nutrients of the composition table (per 100 g) and the unit they are reported in
+NUTRIENTS = (
+    ('calories', 'kcal'),
+    ('protein', 'g'),
+    ('fats', 'g'),
+    ('carbohydrates', 'g'),
+    ('fiber', 'g'),
+    ('sugar', 'g'),
+    ('sodium', 'mg'),
+)
+NUTRIENT_INDEX = {name: index for index, (name, _) in enumerate(NUTRIENTS)}
+# Spellings the LLM uses for the same nutrients
+NUTRIENT_ALIASES = {
+    'calorie': 'calories', 'energy': 'calories', 'kcal': 'calories',
+    'proteins': 'protein', 'fat': 'fats', 'total fat': 'fats',
+    'carbohydrate': 'carbohydrates', 'carbs': 'carbohydrates', 'total carbohydrates': 'carbohydrates',
+    'fibre': 'fiber', 'dietary fiber': 'fiber', 'sugars': 'sugar',
+}
+MASS_GRAMS = {'g': 1.0, 'kg': 1000.0, 'mg': 0.001, 'oz': 28.3495, 'lb': 453.592}
+VOLUME_ML = {
+    'ml': 1.0, 'cl': 10.0, 'dl': 100.0, 'l': 1000.0, 'tsp': 4.929, 'tbsp': 14.787, 'cup': 236.588,
+    'fl oz': 29.574, 'pint': 473.176, 'quart': 946.353, 'gallon': 3785.41, 'pinch': 0.31, 'dash': 0.62,
+}
+# Weight of a container or a vague portion when the food has no unit weight of its own
+PORTION_GRAMS = {'can': 400.0, 'jar': 350.0, 'package': 250.0, 'stick': 113.0, 'slice': 30.0,
+                 'bunch': 100.0, 'handful': 30.0, 'sprig': 1.0, 'head': 500.0, 'fillet': 150.0}
+# Units counting items of the food itself: their weight is the food's unit weight
+COUNT_UNITS = {None, 'piece', 'clove', 'stalk', 'slice', 'fillet', 'stick', 'head'}
+MAX_ALIAS_WORDS = 4
+# Lines without a quantity that weigh next to nothing ("salt to taste", "oil for frying")
+NEGLIGIBLE_REGEX = re.compile(r'\b(?:to taste|as needed|as required|for (?:frying|greasing|garnish|serving|dusting)|'
+                              r'optional)\b', re.IGNORECASE)
+
+
+@dataclass
+class FoodTable:
+    """
+    The bundled food composition table as NumPy arrays, indexed by food.
+    """
+    foods: list[str]
+    aliases: dict[str, int]
+    nutrients: np.ndarray  # (foods, NUTRIENTS) per 100 g
+    grams_per_ml: np.ndarray  # NaN when unknown
+    grams_per_unit: np.ndarray  # NaN when the food is not counted in items
+
+    @classmethod
+    def load(cls, path=FOOD_COMPOSITION_CSV) -> FoodTable:
+        foods, aliases, nutrients, grams_per_ml, grams_per_unit = [], {}, [], [], []
+        with open(path, newline='', encoding='utf-8') as file:
+            for index, row in enumerate(csv.DictReader(file)):
+                foods.append(row['food'])
+                for alias in [row['food'], *row['aliases'].split('|')]:
+                    if alias:
+                        aliases[normalize_ingredient_name(alias)] = index
+                nutrients.append([float(row[name]) for name, _ in NUTRIENTS])
+                grams_per_ml.append(float(row['grams_per_ml'] or 'nan'))
+                grams_per_unit.append(float(row['grams_per_unit'] or 'nan'))
+        return cls(
+            foods=foods,
+            aliases=aliases,
+            nutrients=np.array(nutrients, dtype=np.float64),
+            grams_per_ml=np.array(grams_per_ml, dtype=np.float64),
+            grams_per_unit=np.array(grams_per_unit, dtype=np.float64),
+        )
+
+    def match(self, name: str) -> int | None:
+        """
+        Index of the food named in `name`: the longest known alias it contains, rightmost first
+        (the head noun comes last in English: "chicken broth" is broth, not chicken).
+        """
+        words = normalize_ingredient_name(name).split()
+        for size in range(min(MAX_ALIAS_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size, -1, -1):
+                phrase = ' '.join(words[start:start + size])
+                for candidate in (phrase, phrase[:-1] if phrase.endswith('s') else None,
+                                  phrase[:-2] if phrase.endswith('es') else None):
+                    if candidate and candidate in self.aliases:
+                        return self.aliases[candidate]
+        return None
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_food_table() -> FoodTable:
+    """
+    The food table, loaded once per process.
+    """
+    global _table
+    with _table_lock:
+        if _table is None:
+            _table = FoodTable.load()
+        return _table
+
+
+def ingredient_grams(parsed: ParsedIngredient, food: int, table: FoodTable) -> float | None:
+    """
+    Weight in grams of the parsed ingredient line, or None if it cannot be weighed from the table.
+    """
+    quantity = parsed.mean_quantity
+    if quantity is None:
+        if parsed.unit is not None:
+            return None
+        if NEGLIGIBLE_REGEX.search(parsed.text):
+            return 0.0
+        # "Chicken breast", "Onion": one item of the food, when it is counted in items
+        quantity = 1
+    quantity = float(quantity)
+    if parsed.unit in MASS_UNITS:
+        return quantity * MASS_GRAMS[parsed.unit]
+    if parsed.unit in VOLUME_UNITS:
+        density = table.grams_per_ml[food]
+        # Densities range from oils to flour: without one the weight is a guess, left to the fallback
+        return None if np.isnan(density) else quantity * VOLUME_ML[parsed.unit] * density
+    if parsed.unit in COUNT_UNITS and not np.isnan(table.grams_per_unit[food]):
+        return quantity * table.grams_per_unit[food]
+    if parsed.unit in PORTION_GRAMS:
+        return quantity * PORTION_GRAMS[parsed.unit]
+    return None
+
+
+def compute_nutrition(lines, table: FoodTable = None) -> tuple[np.ndarray, list[str]]:
+    """
+    Nutrient totals of the ingredient lines the engine can resolve.
+
+    Returns:
+        tuple: (totals as an array aligned with NUTRIENTS, lines left unresolved).
+    """
+    table = table or get_food_table()
+    foods, grams, unresolved = [], [], []
+    for line in lines:
+        parsed = parse_ingredient(line)
+        food = table.match(parsed.name) if parsed.name else None
+        weight = ingredient_grams(parsed, food, table) if food is not None else None
+        if weight is None:
+            unresolved.append(line)
+            continue
+        foods.append(food)
+        grams.append(weight)
+
+    if not foods:
+        return np.zeros(len(NUTRIENTS)), unresolved
+    totals = np.asarray(grams) @ table.nutrients[np.asarray(foods)] / 100.0
+    return totals, unresolved
+
+
+def ingredient_lines(recipe) -> list[str]:
+    """
+    All the ingredient lines of a recipe (JSON string or dict), across ingredient groups.
+    """
+    if isinstance(recipe, str):
+        recipe = json.loads(recipe)
+    lines = []
+    for group in recipe.get('ingredients') or []:
+        if isinstance(group, dict):
+            lines.extend(line for line in group.get('list') or [] if isinstance(line, str) and line.strip())
+        elif isinstance(group, str) and group.strip():
+            lines.append(group)
+    return lines
+
+
+def normalize_nutrients(nutrients, factor: float = 1.0) -> list[dict]:
+    """
+    Rename the nutrients reported by the LLM to the table's names and units, scaled by `factor`.
+
+    Nutrients the table does not track (vitamins, minerals...) are kept as reported.
+    """
+    normalized = []
+    for nutrient in nutrients or []:
+        name = str(nutrient.get('name', '')).strip().lower()
+        name = NUTRIENT_ALIASES.get(name, name)
+        quantity = float(nutrient.get('quantity') or 0) * factor
+        unit = nutrient.get('unit')
+        if name in NUTRIENT_INDEX:
+            table_unit = NUTRIENTS[NUTRIENT_INDEX[name]][1]
+            reported_unit = str(unit or table_unit).strip().lower()
+            if (reported_unit, table_unit) == ('g', 'mg'):
+                quantity *= 1000
+            elif (reported_unit, table_unit) == ('mg', 'g'):
+                quantity /= 1000
+            unit = table_unit
+        else:
+            name = nutrient.get('name')
+        normalized.append({'name': name, 'quantity': quantity, 'unit': unit})
+    return normalized
+
+
+def add_nutrients(totals: np.ndarray, extras: dict, nutrients, factor: float = 1.0):
+    """
+    Add normalized nutrients, scaled by `factor`, to the totals (tracked nutrients) and extras (others).
+    """
+    for nutrient in nutrients:
+        quantity = nutrient['quantity'] * factor
+        if nutrient['name'] in NUTRIENT_INDEX:
+            totals[NUTRIENT_INDEX[nutrient['name']]] += quantity
+        else:
+            key = (nutrient['name'], nutrient['unit'])
+            extras[key] = extras.get(key, 0.0) + quantity
+
+
+def format_nutrition(totals: np.ndarray, extras: dict = None) -> list[dict]:
+    nutritions = [
+        {'name': name, 'quantity': round(float(quantity), 2), 'unit': unit}
+        for (name, unit), quantity in zip(NUTRIENTS, totals)
+    ]
+    nutritions.extend(
+        {'name': name, 'quantity': round(quantity, 2), 'unit': unit}
+        for (name, unit), quantity in (extras or {}).items()
+    )
+    return nutritions
+
+
+def ingredient_memo_key(parsed: ParsedIngredient) -> str | None:
+    """
+    Canonical key of an ingredient in the memo table: its unit and normalized name, so that
+    "2 cups flour" and "1 cup of flour, sifted" share the nutrients of one cup of flour.
+    """
+    name = normalize_ingredient_name(parsed.name)
+    if not name:
+        return None
+    unit = (parsed.unit or 'unit') if parsed.quantity is not None else 'any'
+    return f'{unit}:{name}'[:255]
+
+
+def quantity_factor(parsed: ParsedIngredient) -> float:
+    quantity = parsed.mean_quantity
+    return float(quantity) if quantity else 1.0
+
+
+def resolve_unresolved_lines(lines, totals: np.ndarray, extras: dict):
+    """
+    Add the nutrients of the lines the engine cannot resolve: from the memo table when the
+    ingredient was analysed before, otherwise from the LLM, whose answers are memoized.
+    """
+    parsed = [parse_ingredient(line) for line in lines]
+    keys = [ingredient_memo_key(ingredient) for ingredient in parsed]
+    memo = NutritionMemoService.get_many(key for key in keys if key)
+
+    misses = []
+    for index, (ingredient, key) in enumerate(zip(parsed, keys)):
+        if key in memo:
+            add_nutrients(totals, extras, memo[key], quantity_factor(ingredient))
+        else:
+            misses.append(index)
+    record_metric('nutrition.lines_memo', len(lines) - len(misses))
+    record_metric('nutrition.lines_llm', len(misses))
+    if not misses:
+        return
+
+    estimates = analyse_nutrition_per_ingredient([lines[index] for index in misses])
+    if estimates is None:
+        # Per-line estimate unavailable: estimate the lines together, without memoizing
+        fallback = analyse_nutrition_base_ingredient('\n'.join(lines[index] for index in misses))
+        add_nutrients(totals, extras, normalize_nutrients(json.loads(fallback).get('nutritions')))
+        return
+
+    learned = {}
+    for position, index in enumerate(misses):
+        nutrients = normalize_nutrients(estimates.get(position))
+        add_nutrients(totals, extras, nutrients)
+        if keys[index] and position in estimates:
+            learned[keys[index]] = normalize_nutrients(nutrients, 1 / quantity_factor(parsed[index]))
+    NutritionMemoService.store_many(learned)
+
+
+def analyse_recipe_nutrition(recipe) -> str | None:
+    """
+    Nutrition of a recipe from the local composition table. The ingredient lines the engine
+    cannot parse or match come from the memo table, and only unseen ones are sent to the LLM.
+
+    Returns:
+        str: JSON `{'nutritions': [{'name', 'quantity', 'unit'}]}`, the format of
+        analyse_nutrition_base_ingredient.
+    """
+    try:
+        lines = ingredient_lines(recipe)
+        totals, unresolved = compute_nutrition(lines)
+    except Exception as e:
+        logger.error(f"Nutrition engine failed, falling back to the LLM: {e}")
+        return analyse_nutrition_base_ingredient(recipe)
+
+    record_metric('nutrition.lines_resolved', len(lines) - len(unresolved))
+    extras = {}
+    if unresolved:
+        logger.info(f"Nutrition engine could not resolve {len(unresolved)} of {len(lines)} lines: {unresolved}")
+        # Resolved on copies: whatever fails, the locally computed totals are kept
+        resolved_totals, resolved_extras = totals.copy(), {}
+        try:
+            resolve_unresolved_lines(unresolved, resolved_totals, resolved_extras)
+            totals, extras = resolved_totals, resolved_extras
+        except Exception as e:
+            logger.error(f"Could not estimate the nutrition of the unresolved lines: {e}")
+    return json.dumps({'nutritions': format_nutrition(totals, extras)})
@@ -8,9 +8,7 @@ import asyncio
 import logging
 
 import browser_cookie3
-from bs4 import BeautifulSoup
 from datetime import datetime
-import json
 import numpy as np
 import os
 import pandas as pd
@@ -20,6 +18,8 @@ import requests
 from TikTokApi import TikTokApi
 import time
 
+from utils.html_parser import extract_script_json
+
 logger = logging.getLogger(__name__)
 
 global cookies
@@ -228,12 +228,7 @@ def get_tiktok_json(video_url,browser_name=None):
                       timeout=20)
     # retain any new cookies that got set in this request
     cookies = tt.cookies
-    soup = BeautifulSoup(tt.text, "html.parser")
-    tt_script = soup.find('script', attrs={'id':"SIGI_STATE"})
-    try:
-        tt_json = json.loads(tt_script.string)
-    except AttributeError:
-        return
+    tt_json = extract_script_json(tt.content, "SIGI_STATE")
     return tt_json
 
 
@@ -249,11 +244,8 @@ def alt_get_tiktok_json(video_url,browser_name=None):
                       timeout=20)
     # retain any new cookies that got set in this request
     cookies = tt.cookies
-    soup = BeautifulSoup(tt.text, "html.parser")
-    tt_script = soup.find('script', attrs={'id':"__UNIVERSAL_DATA_FOR_REHYDRATION__"})
-    try:
-        tt_json = json.loads(tt_script.string)
-    except AttributeError:
+    tt_json = extract_script_json(tt.content, "__UNIVERSAL_DATA_FOR_REHYDRATION__")
+    if tt_json is None:
         logger.error(
             "The function encountered a downstream error and did not deliver any data,"
             "which happens periodically for various reasons. Please try again later."
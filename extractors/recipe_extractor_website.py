@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import json
 import logging
-import os
 import random
 import time
 import uuid
@@ -10,17 +9,29 @@ from io import BytesIO
 
 import requests
 import tiktoken  # Import tiktoken
-from bs4 import BeautifulSoup
-from openai import OpenAI
 from PIL import Image
 
+from app.utils.page_cache import cached_response
+from app.utils.page_cache import conditional_headers
+from app.utils.page_cache import get_cached_page
+from app.utils.page_cache import is_fresh
+from app.utils.page_cache import refresh_page
+from app.utils.page_cache import store_page
 from app.utils.s3_storage import save_image_to_s3_from_url
+from app.utils.stats import increment_stat
+from extractors.content_extractor import extract_main_content
+from extractors.content_extractor import extract_page_text
+from extractors.structured_recipe import extract_recipe_json
+from extractors.structured_recipe import RECIPE_JSON_INSTRUCTIONS
+from extractors.structured_data import extract_schema_recipe
+from extractors.structured_recipe import resolve_extraction_mode
+from utils.html_parser import parse_html
+from utils.http_fetcher import fetch_page
+from utils.llm_gateway import chat_completion
+from utils.task_metrics import record_metric
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'), organization=os.environ.get('OPENAI_ORGANIZATION'))
-
 
 def extract_main_image(soup):
     """
@@ -36,80 +47,37 @@ def extract_main_image(soup):
     return None
 
 
-def get_website_content_v2(url):
+def get_website_content(url):
     """
-        Function to get website content using ScrapeNinja API.
-        """
-    api_url = 'https://scrapeninja.p.rapidapi.com/scrape'
-
-    try:
-        querystring = {'url': url}
-
-        headers = {
-            'x-rapidapi-key': '1776083f1dmsh864701c7fc5a69dp1d97f3jsn8cb7620cf8c2',
-            'x-rapidapi-host': 'scrapeninja.p.rapidapi.com'
-        }
-
-        api_response = requests.get(api_url, headers=headers, params=querystring)
-        api_response.raise_for_status()  # Raise an exception for HTTP errors
+    Fetch a recipe page through the page cache and the pooled fetcher (direct, residential proxy, then ScrapeNinja).
 
-        # data = api_response.json()
+    A fresh cached page is returned without any request; an older one is revalidated with a conditional
+    request, and still served if the site cannot be reached.
 
-        return api_response
-    except Exception:
-        return None
-
-
-def get_website_content(url, retry_count: int = 0, proxies=None):
+    Returns:
+        requests.Response: The page, or None if every strategy failed.
     """
-    Function to handle website requests with retries for handling 403 errors.
-    """
-    headers_list = [
-        {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-        },
-        {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36"
-        },
-        {
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.150 Safari/537.36"
-        },
-    ]
-
-    MAX_RETRIES = 5
-    # for _ in range(5):  # Retry up to 5 times
-    status_code = None
-    try:
-        headers = random.choice(headers_list)
-        response = requests.get(url, headers=headers, proxies=proxies)
-        print(response.text)
-        response.raise_for_status()
-        status_code = response.status_code
-        return response
-    except Exception as e:
-        logger.error(e)
-        logger.error(f"status code {status_code}")
-        if retry_count < MAX_RETRIES + 1:
-            retry_count += 1
-            print(f"Download failed. Retrying ({retry_count}/{MAX_RETRIES - 1})...")
-            host = os.getenv("RESIDENTIAL_PROXY_HOST")
-            port = os.getenv("RESIDENTIAL_PROXY_PORT")
-
-            username = os.getenv("RESIDENTIAL_PROXY_USERNAME")
-            password = os.getenv("RESIDENTIAL_PROXY_PASSWORD")
-
-            proxies = {
-                'https': f'http://customer-{username}:{password}@{host}:{port}',
-            }
-
-            if status_code == 403:
-                time.sleep(random.uniform(1, 3))  # Random sleep to avoid being blocked
-                return get_website_content(url, proxies=proxies, retry_count=retry_count)
-            time.sleep(random.uniform(1, 15))
-
-            return get_website_content(url, proxies=proxies, retry_count=retry_count)
-        else:
-            return get_website_content_v2(url)  # get_website_content_v2(url)
+    entry = get_cached_page(url)
+    if entry and is_fresh(entry):
+        increment_stat('website.page_cache.hit')
+        record_metric('fetch.strategy', 'cache')
+        return cached_response(entry)
+
+    response, report = fetch_page(url, headers=conditional_headers(entry))
+    increment_stat(f"website.fetch.{report.strategy or 'failed'}")
+    if response is None:
+        if entry:
+            logger.warning(f"Serving the stale cached copy of {url}")
+            increment_stat('website.page_cache.stale')
+            return cached_response(entry)
+        return None
+    if response.status_code == 304 and entry:
+        increment_stat('website.page_cache.revalidated')
+        refresh_page(url, entry, response)
+        return cached_response(entry)
+    increment_stat('website.page_cache.miss')
+    store_page(url, response, validators=report.strategy != 'scrapeninja')
+    return response
 
 
 def get_image_with_retry(image_url, retries=5):
@@ -145,93 +113,130 @@ def save_image_locally(image, filename='recipe_image.jpg'):
         logger.error(f"Error saving the image: {e}")
 
 
-def scrape_and_analyze_recipe(url):
-    # Make a request to the given URL with retries and user-agent spoofing
-    start = time.time()
+def scrape_and_analyze_recipe(url, mode: str = None, upload_image: bool = True):
+    """
+    Scrape a recipe website and extract its recipe.
 
+    Returns:
+        tuple: (recipe JSON string, whether an image was found, S3 URL of the image). With
+        `upload_image=False` the last item is the source image URL, left for the caller to upload.
+    """
+    # Make a request to the given URL with retries and user-agent spoofing
     response = get_website_content(url)
     if not response:
         return {'error': 'Failed to fetch website content. Please try again.'}, False, None
-    end = time.time()
-    print(f"get_website_content took {end - start} seconds")
 
     # Parse the HTML content
     start = time.time()
-    soup = BeautifulSoup(response.text, 'html.parser')
-    end = time.time()
-    print(f"parsing html took {end - start} seconds")
+    soup = parse_html(response.text)
+    record_metric('website.parse_seconds', round(time.time() - start, 3))
+
+    # Fast path: a recipe embedded as schema.org structured data needs no model call
+    schema_recipe = extract_schema_recipe(soup)
+    increment_stat(f"website.structured_data.{'hit' if schema_recipe else 'miss'}")
+    if schema_recipe:
+        logger.info(f"Recipe read from the structured data of {url}")
+        record_metric('recipe.extraction_mode', 'structured_data')
+        main_image_url = schema_recipe.pop('image_url', None) or extract_main_image(soup)
+        return recipe_result(json.dumps(schema_recipe), main_image_url, upload_image)
 
     # Extract title and body content from HTML
     title = soup.title.string if soup.title else "No title found"
 
-    start = time.time()
-    # Extract all text content from various relevant tags
-
-    body_content = soup.body.get_text(separator=" ", strip=True)
-    end = time.time()
-    # print(f"Extract all
-    # # Extract all text content from various relevant tags
-    body_content = " ".join(
-        element.get_text(separator=" ", strip=True)
-        for element in soup.find_all(['p', 'div', 'span', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'a'])
-    )
-
-    print(f"body text scrap: {body_content}")
-    print(f"len of body {len(body_content)}")
+    # Extract main image, before the boilerplate holding it may be removed
+    main_image_url = extract_main_image(soup)
 
-    token_count, tokens = tokenize_text(body_content)
-    print(f"Token Count: {token_count}")
+    start = time.time()
+    page_text = extract_page_text(soup)
+    token_count, _ = tokenize_text(page_text)
 
     # Check if token count is below 1000
     if token_count < 1000:
         raise ValueError("The content has fewer than 1,000 tokens, which does not meet the minimum requirement.")
 
+    body_content = extract_main_content(soup, page_text)
+    content_token_count, _ = tokenize_text(body_content)
+    record_metric('website.content_extraction_seconds', round(time.time() - start, 3))
+    record_metric('website.tokens_before', token_count)
+    record_metric('website.tokens_after', content_token_count)
+    logger.info(f"Main content of {url}: {token_count} -> {content_token_count} tokens")
+
     # Limit body content to the first 150,000 characters if it exceeds this character count
     if len(body_content) > 150000:
         body_content = body_content[:150000]  # Truncate to the first 150,000 characters
-        print('Character count exceeded 150,000. Truncated content to the first 150,000 characters.')
-
-    # Extract main image
-    main_image_url = extract_main_image(soup)
-    got_image = bool(main_image_url)
+        logger.info('Character count exceeded 150,000. Truncated content to the first 150,000 characters.')
 
     # Analyze content using AI
     try:
-        analyse_recipe_message = [
-            {
-                "role": "system",
-                "content": (
-                    "You get information from recipe websites: recipe title, servings, total time, ingredients, directions. "
-                    "You will output in simple markdown. You will not output any description of the recipe. "
-                    "If there is no content to review, do not make up a recipe, instead output this: 'Cannot identify Recipe. Please try again with another link.'"
-                    "You will ALWAYS supply ingredient amounts. You will supply EXACTLY what you find in the text. "
-                    "YOU MUST AND WILL ALWAYS GIVE THE FULL RECIPES, AND MUST BE IN ORDER. "
-                    "IMPORTANT: The recipe **MUST NOT BE TRUNCATED**. Include every section: title, servings, total time, ingredients, and directions. Complete information is mandatory."
-
-                )
-            },
-            {
-                "role": "user",
-                "content": f"Title: {title}\nContent: {body_content}\n\n"
-                           f"Never output a '''markdown identifier before you begin, just the pure formatting. "
-                           "IMPORTANT: The recipe **MUST NOT BE TRUNCATED**. Include every section: title, servings, total time, ingredients, and directions. Complete information is mandatory."
-
-            }
-        ]
-        recipe_info_markdown = get_complete_response(messages=analyse_recipe_message)
-
-        logger.error(recipe_info_markdown)
-        recipe_info = group_markdown_to_json(recipe_info_markdown)
+        recipe_info = None
+        if resolve_extraction_mode(mode) == 'structured':
+            recipe_info = extract_recipe_json(
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "You get information from recipe websites: recipe title, servings, total time, ingredients, directions. "
+                            "You will not output any description of the recipe. "
+                            "You will ALWAYS supply ingredient amounts. You will supply EXACTLY what you find in the text, in order. "
+                            + RECIPE_JSON_INSTRUCTIONS
+                        )
+                    },
+                    {"role": "user", "content": f"Title: {title}\nContent: {body_content}"}
+                ],
+                model='gpt-4-turbo',
+            )
+        if recipe_info is None:
+            record_metric('recipe.extraction_mode', 'two_pass')
+            recipe_info = extract_recipe_two_pass(title, body_content)
         logger.error(recipe_info)
-        s3_file_name = f'{uuid.uuid4()}_image.jpg'
-        s3_url = save_image_to_s3_from_url(main_image_url, s3_file_name)
-        logger.info(f"s3_image: {s3_url}")
-        return recipe_info, got_image, s3_url
+        return recipe_result(recipe_info, main_image_url, upload_image)
     except Exception as e:
         logger.error(f"An error occurred while processing the recipe analysis failed: {e}")
     return None, False, None
 
 
+def recipe_result(recipe_info, main_image_url, upload_image: bool):
+    """
+    The (recipe, got_image, image URL) result of scrape_and_analyze_recipe, uploading the image if asked.
+    """
+    if not upload_image:
+        return recipe_info, bool(main_image_url), main_image_url
+    s3_file_name = f'{uuid.uuid4()}_image.jpg'
+    s3_url = save_image_to_s3_from_url(main_image_url, s3_file_name)
+    logger.info(f"s3_image: {s3_url}")
+    return recipe_info, bool(main_image_url), s3_url
+
+
+def extract_recipe_two_pass(title, body_content):
+    """
+    Legacy extraction: the recipe as markdown first, then converted to JSON by a second call.
+    """
+    analyse_recipe_message = [
+        {
+            "role": "system",
+            "content": (
+                "You get information from recipe websites: recipe title, servings, total time, ingredients, directions. "
+                "You will output in simple markdown. You will not output any description of the recipe. "
+                "If there is no content to review, do not make up a recipe, instead output this: 'Cannot identify Recipe. Please try again with another link.'"
+                "You will ALWAYS supply ingredient amounts. You will supply EXACTLY what you find in the text. "
+                "YOU MUST AND WILL ALWAYS GIVE THE FULL RECIPES, AND MUST BE IN ORDER. "
+                "IMPORTANT: The recipe **MUST NOT BE TRUNCATED**. Include every section: title, servings, total time, ingredients, and directions. Complete information is mandatory."
+
+            )
+        },
+        {
+            "role": "user",
+            "content": f"Title: {title}\nContent: {body_content}\n\n"
+                       f"Never output a '''markdown identifier before you begin, just the pure formatting. "
+                       "IMPORTANT: The recipe **MUST NOT BE TRUNCATED**. Include every section: title, servings, total time, ingredients, and directions. Complete information is mandatory."
+
+        }
+    ]
+    recipe_info_markdown = get_complete_response(messages=analyse_recipe_message)
+    logger.error(recipe_info_markdown)
+    return group_markdown_to_json(recipe_info_markdown)
+
+
 def analyse_nutrition_base_ingredient(ingredient):
     try:
         nutrition_base_ingredient_message = [
@@ -260,6 +265,43 @@ def analyse_nutrition_base_ingredient(ingredient):
     return nutrtition_info
 
 
+def analyse_nutrition_per_ingredient(lines) -> dict[int, list] | None:
+    """
+    Estimate the nutrients of each ingredient line separately, in a single call.
+
+    Returns:
+        dict: The nutrient list of each line, keyed by its index in `lines`, or None if the call failed.
+    """
+    numbered_lines = '\n'.join(f"{index}. {line}" for index, line in enumerate(lines))
+    try:
+        nutrition_per_ingredient_message = [
+            {
+                "role": "system",
+                "content": (
+                    "You are a nutrition calculation assistant. "
+                    "For each numbered ingredient line, estimate the nutrients of the stated amount. "
+                    "Use categories like 'calories', 'protein', 'fats', 'carbohydrates', 'fiber', 'sugar', 'sodium', "
+                    "and micronutrients such as 'vitamin C'. Ingredient names NEVER appear as nutrients. "
+                    "Your response MUST strictly follow this JSON format, with one entry per line: "
+                    "{ 'ingredients': [ "
+                    "    { 'index': int, 'nutritions': [ { 'name': 'string', 'quantity': float, 'unit': 'string' } ] } "
+                    "]}. "
+                    "If specific nutrients cannot be determined, set quantity as 0."
+                )
+            },
+            {"role": "user", "content": f"Here are the ingredient lines:\n\n{numbered_lines}"}
+        ]
+        response = get_complete_response(messages=nutrition_per_ingredient_message)
+        return {
+            int(entry['index']): entry.get('nutritions') or []
+            for entry in json.loads(response).get('ingredients', [])
+            if 0 <= int(entry.get('index', -1)) < len(lines)
+        }
+    except Exception as e:
+        logger.error(f"AI analysis failed: {e}")
+    return None
+
+
 def group_markdown_to_json(recipe_info_markdown):
     try:
         group_markdown_to_json_messages = [
@@ -327,10 +369,7 @@ def get_complete_response(messages):
 
     while attempts < max_retries:
         start = time.time()
-        ai_response = client.chat.completions.create(
-            model='gpt-4-turbo',
-            messages=messages,
-        )
+        ai_response = chat_completion(messages=messages, model='gpt-4-turbo')
         end = time.time()
         logger.error(f"OpenAI took {end - start} seconds")
         break_out = False
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import html
+import itertools
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+INGREDIENTS_TITLE = 'Ingredients'
+DIRECTIONS_TITLE = 'Directions'
+ISO_DURATION_REGEX = re.compile(
+    r'P(?:(?P<days>\d+(?:\.\d+)?)D)?(?:T(?:(?P<hours>\d+(?:\.\d+)?)H)?(?:(?P<minutes>\d+(?:\.\d+)?)M)?(?:(?P<seconds>\d+(?:\.\d+)?)S)?)?',
+    re.IGNORECASE,
+)
+TAG_REGEX = re.compile(r'<[^>]+>')
+
+
+def _clean(value) -> str:
+    """
+    Plain text of a structured-data value: entities decoded, markup and extra whitespace removed.
+    """
+    if value is None:
+        return ''
+    text = TAG_REGEX.sub(' ', html.unescape(str(value)))
+    return ' '.join(text.split())
+
+
+def _is_type(node, type_name: str) -> bool:
+    if not isinstance(node, dict):
+        return False
+    types = node.get('@type', [])
+    types = types if isinstance(types, list) else [types]
+    return any(str(node_type).split('/')[-1].split(':')[-1] == type_name for node_type in types)
+
+
+def _find_recipe_nodes(node):
+    """
+    Yield the Recipe objects of a JSON-LD document, wherever they are nested (@graph, lists, mainEntity...).
+    """
+    if isinstance(node, list):
+        for item in node:
+            yield from _find_recipe_nodes(item)
+    elif isinstance(node, dict):
+        if _is_type(node, 'Recipe'):
+            yield node
+            return
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                yield from _find_recipe_nodes(value)
+
+
+def format_duration(value) -> str:
+    """
+    Render an ISO 8601 duration ("PT1H30M") the way recipes write it ("1 hour 30 minutes").
+    """
+    match = ISO_DURATION_REGEX.fullmatch(str(value or '').strip())
+    if not match or not any(match.groupdict().values()):
+        return _clean(value)
+    parts = match.groupdict()
+    minutes = round(float(parts['days'] or 0) * 1440 + float(parts['hours'] or 0) * 60
+                    + float(parts['minutes'] or 0) + float(parts['seconds'] or 0) / 60)
+    hours, minutes = divmod(minutes, 60)
+    text = []
+    if hours:
+        text.append(f"{hours} hour{'s' if hours > 1 else ''}")
+    if minutes or not hours:
+        text.append(f"{minutes} minute{'s' if minutes != 1 else ''}")
+    return ' '.join(text)
+
+
+def _first_text(value) -> str:
+    if isinstance(value, list):
+        return next((_clean(item) for item in value if _clean(item)), '')
+    return _clean(value)
+
+
+def _image_url(value) -> str | None:
+    if isinstance(value, list):
+        return next((url for url in map(_image_url, value) if url), None)
+    if isinstance(value, dict):
+        return _image_url(value.get('url') or value.get('contentUrl'))
+    return _clean(value) or None
+
+
+def _instruction_groups(value) -> list[dict]:
+    """
+    Map recipeInstructions (text, list of strings, HowToStep, HowToSection) to direction groups.
+    """
+    if isinstance(value, str):
+        steps = [_clean(step) for step in re.split(r'\n+|<br\s*/?>|</p>', value, flags=re.IGNORECASE)]
+        return [{'title_of_direction': DIRECTIONS_TITLE, 'list': [step for step in steps if step]}]
+
+    groups = []
+    loose_steps = []
+    for item in value if isinstance(value, list) else [value]:
+        if _is_type(item, 'HowToSection'):
+            if loose_steps:
+                groups.append({'title_of_direction': DIRECTIONS_TITLE, 'list': loose_steps})
+                loose_steps = []
+            steps = [step for group in _instruction_groups(item.get('itemListElement') or []) for step in group['list']]
+            if steps:
+                groups.append({'title_of_direction': _clean(item.get('name')) or DIRECTIONS_TITLE, 'list': steps})
+        elif isinstance(item, dict):
+            step = _clean(item.get('text') or item.get('name'))
+            if step:
+                loose_steps.append(step)
+        elif isinstance(item, list):
+            loose_steps.extend(step for group in _instruction_groups(item) for step in group['list'])
+        elif _clean(item):
+            loose_steps.append(_clean(item))
+    if loose_steps:
+        groups.append({'title_of_direction': DIRECTIONS_TITLE, 'list': loose_steps})
+    return groups
+
+
+def map_schema_recipe(node: dict) -> dict | None:
+    """
+    Map a schema.org Recipe object to our recipe JSON shape.
+
+    Returns:
+        dict: The recipe, with its 'image_url', or None if the title, ingredients or directions are
+        missing (the page then goes to the LLM, which can read them from the text).
+    """
+    title = _first_text(node.get('name') or node.get('headline'))
+    ingredients = [_clean(line) for line in node.get('recipeIngredient') or node.get('ingredients') or []]
+    ingredients = [line for line in ingredients if line]
+    directions = _instruction_groups(node.get('recipeInstructions') or [])
+    if not title or not ingredients or not directions:
+        return None
+
+    total_time = node.get('totalTime')
+    if total_time:
+        preparation_time = format_duration(total_time)
+    else:
+        preparation_time = ' + '.join(format_duration(node[key]) for key in ('prepTime', 'cookTime') if node.get(key))
+    return {
+        'title': title,
+        'servings': _first_text(node.get('recipeYield')),
+        'preparation_time': preparation_time,
+        'ingredients': [{'title_of_ingredient': INGREDIENTS_TITLE, 'list': ingredients}],
+        'directions': directions,
+        'image_url': _image_url(node.get('image')),
+    }
+
+
+def _json_ld_recipes(soup):
+    for script in soup.find_all('script', type=re.compile(r'application/ld\+json', re.IGNORECASE)):
+        try:
+            document = json.loads(script.string or script.get_text() or '', strict=False)
+        except ValueError as e:
+            logger.info(f"Skipping invalid JSON-LD block: {e}")
+            continue
+        yield from _find_recipe_nodes(document)
+
+
+def _attribute_value(element) -> str:
+    for attribute in ('content', 'datetime', 'src', 'href'):
+        if element.get(attribute):
+            return element[attribute]
+    return element.get_text(' ', strip=True)
+
+
+def _scope(element, type_attribute: str):
+    """
+    The item a property element belongs to: its nearest ancestor opening an item.
+    """
+    return next((parent for parent in element.parents
+                 if parent.has_attr(type_attribute) or parent.has_attr('itemscope')), None)
+
+
+def _scoped_recipes(soup, type_attribute: str, property_attribute: str):
+    """
+    Recipe objects written as microdata (itemtype/itemprop) or RDFa (typeof/property) annotations.
+
+    Only the properties of the Recipe item itself are read: the name of a nested author, rating
+    or step is not the recipe's.
+    """
+    for root in soup.find_all(attrs={type_attribute: re.compile(r'(^|[/:\s])Recipe(\s|$)')}):
+        node = {'@type': 'Recipe', 'recipeInstructions': []}
+        for element in root.find_all(attrs={property_attribute: True}):
+            if _scope(element, type_attribute) is not root:
+                continue
+            for name in element[property_attribute].split():
+                name = name.split(':')[-1].split('/')[-1]
+                if name in ('recipeIngredient', 'ingredients'):
+                    node.setdefault('recipeIngredient', []).append(_attribute_value(element))
+                elif name == 'recipeInstructions':
+                    # Either one block holding every step or one element per step
+                    steps = element.find_all(attrs={property_attribute: re.compile(r'\btext\b')})
+                    node['recipeInstructions'].extend(_attribute_value(step) for step in steps)
+                    if not steps:
+                        items = element.find_all('li')
+                        if items:
+                            node['recipeInstructions'].extend(item.get_text(' ', strip=True) for item in items)
+                        else:
+                            node['recipeInstructions'].append(_attribute_value(element))
+                elif name in ('name', 'recipeYield', 'totalTime', 'prepTime', 'cookTime', 'image') and name not in node:
+                    node[name] = _attribute_value(element)
+        yield node
+
+
+def extract_schema_recipe(soup) -> dict | None:
+    """
+    Read the recipe from the structured data embedded in the page: JSON-LD first, then microdata and RDFa.
+
+    Returns:
+        dict: The recipe in our JSON shape plus its 'image_url', or None if the page has no usable Recipe.
+    """
+    candidates = itertools.chain(
+        _json_ld_recipes(soup),
+        _scoped_recipes(soup, 'itemtype', 'itemprop'),
+        _scoped_recipes(soup, 'typeof', 'property'),
+    )
+    for node in candidates:
+        try:
+            recipe = map_schema_recipe(node)
+        except (AttributeError, TypeError, ValueError) as e:
+            logger.info(f"Skipping unreadable schema.org Recipe: {e}")
+            continue
+        if recipe:
+            return recipe
+    return None
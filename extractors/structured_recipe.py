@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+
+from utils.llm_gateway import chat_completion
+from utils.task_metrics import record_metric
+
+logger = logging.getLogger(__name__)
+
+# 'structured': ask for the final JSON in the extraction call itself.
+# 'two_pass': extract markdown, then convert it with group_markdown_to_json (legacy path, also the fallback).
+RECIPE_EXTRACTION_MODE = os.getenv('RECIPE_EXTRACTION_MODE', 'structured')
+EXTRACTION_MODES = ('structured', 'two_pass')
+# Models accepting `response_format: json_schema`; the others get plain JSON mode
+JSON_SCHEMA_MODELS = ('gpt-4o',)
+
+_ingredient_group = {
+    'type': 'object',
+    'properties': {
+        'title_of_ingredient': {'type': 'string'},
+        'list': {'type': 'array', 'items': {'type': 'string'}},
+    },
+    'required': ['title_of_ingredient', 'list'],
+    'additionalProperties': False,
+}
+_direction_group = {
+    'type': 'object',
+    'properties': {
+        'title_of_direction': {'type': 'string'},
+        'list': {'type': 'array', 'items': {'type': 'string'}},
+    },
+    'required': ['title_of_direction', 'list'],
+    'additionalProperties': False,
+}
+RECIPE_JSON_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'title': {'type': 'string'},
+        'servings': {'type': 'string'},
+        'preparation_time': {'type': 'string'},
+        'ingredients': {'type': 'array', 'items': _ingredient_group},
+        'directions': {'type': 'array', 'items': _direction_group},
+    },
+    'required': ['title', 'servings', 'preparation_time', 'ingredients', 'directions'],
+    'additionalProperties': False,
+}
+
+RECIPE_JSON_INSTRUCTIONS = (
+    "Output a single JSON object with exactly these fields: "
+    "'title' (the recipe's name), "
+    "'servings' (number of servings with its unit if and only if it is available, else an empty string), "
+    "'preparation_time' (total preparation and cooking time as a single string), "
+    "'ingredients' (a list of groups {'title_of_ingredient': string, 'list': [one string per ingredient, with its amount]}), "
+    "'directions' (a list of groups {'title_of_direction': string, 'list': [one string per step, in order]}). "
+    "If the title of an ingredient group or a direction group is not available, use 'None' as its title. "
+    "No nested objects other than these ones. "
+    "If there is no recipe in the content, do not make up a recipe: return empty 'ingredients' and 'directions' lists. "
+    "IMPORTANT: The recipe **MUST NOT BE TRUNCATED**. Every ingredient and every step is mandatory."
+)
+
+
+def resolve_extraction_mode(mode: str = None) -> str:
+    mode = mode or RECIPE_EXTRACTION_MODE
+    if mode not in EXTRACTION_MODES:
+        logger.warning(f"Unknown recipe extraction mode {mode!r}, using 'structured'")
+        return 'structured'
+    return mode
+
+
+def response_format(model: str) -> dict:
+    if model.startswith(JSON_SCHEMA_MODELS):
+        return {
+            'type': 'json_schema',
+            'json_schema': {'name': 'recipe', 'strict': True, 'schema': RECIPE_JSON_SCHEMA},
+        }
+    return {'type': 'json_object'}
+
+
+def extract_recipe_json(messages, model: str, **params) -> str | None:
+    """
+    Extract the recipe in its final JSON shape with a single structured-output call.
+
+    Returns:
+        str: The recipe as a JSON string, an empty string if the content holds no recipe,
+        or None if the call failed or its output is unusable (the caller falls back to the two-pass path).
+    """
+    try:
+        result = chat_completion(messages=messages, model=model, response_format=response_format(model), **params)
+        choice = result.choices[0]
+        if choice.finish_reason != 'stop' or getattr(choice.message, 'refusal', None):
+            logger.warning(f"Structured extraction stopped with {choice.finish_reason}, falling back to two passes")
+            return None
+        recipe = json.loads(choice.message.content)
+    except Exception as e:
+        logger.error(f"Structured recipe extraction failed: {e}")
+        return None
+
+    if not isinstance(recipe, dict) or not isinstance(recipe.get('ingredients', []), list):
+        logger.warning('Structured extraction returned an unexpected shape, falling back to two passes')
+        return None
+    record_metric('recipe.extraction_mode', 'structured')
+    if not recipe.get('ingredients') and not recipe.get('directions'):
+        logger.info('Structured extraction found no recipe in the content')
+        return ''
+    return json.dumps(recipe)
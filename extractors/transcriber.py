@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import logging
+import os
+import random
+import re
+import time
+import uuid
+
+import ffmpeg
+
+from utils.llm_gateway import transcription
+from utils.media_info import probe_media
+from utils.pipeline import StageExecutor
+from utils.settings import BASE_DIR
+from utils.task_metrics import record_metric
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_FOLDER = BASE_DIR / 'downloads'
+WHISPER_CHUNK_SECONDS = int(os.getenv('WHISPER_CHUNK_SECONDS', 300))
+WHISPER_PARALLELISM = int(os.getenv('WHISPER_PARALLELISM', 4))
+WHISPER_CHUNK_RETRIES = int(os.getenv('WHISPER_CHUNK_RETRIES', 2))
+SILENCE_NOISE = '-35dB'
+SILENCE_MIN_SECONDS = 0.4
+
+SILENCE_START_REGEX = re.compile(r'silence_start: (-?\d+(?:\.\d+)?)')
+SILENCE_END_REGEX = re.compile(r'silence_end: (\d+(?:\.\d+)?)')
+
+
+def detect_silences(audio_path) -> list[tuple[float, float]]:
+    """
+    Find the silent stretches of the audio with ffmpeg's silencedetect filter.
+
+    Returns:
+        list: (start, end) of every silence, in seconds.
+    """
+    _, stderr = (
+        ffmpeg
+        .input(str(audio_path))
+        .filter('silencedetect', noise=SILENCE_NOISE, d=SILENCE_MIN_SECONDS)
+        .output('-', format='null')
+        .run(capture_stderr=True)
+    )
+    log = stderr.decode(errors='ignore')
+    starts = [max(0.0, float(value)) for value in SILENCE_START_REGEX.findall(log)]
+    ends = [float(value) for value in SILENCE_END_REGEX.findall(log)]
+    return list(zip(starts, ends))
+
+
+def plan_chunks(duration: float, silences, max_seconds: float = WHISPER_CHUNK_SECONDS) -> list[tuple[float, float]]:
+    """
+    Split [0, duration] into chunks of at most `max_seconds`, cutting in the middle of a silence
+    whenever one falls in the second half of the chunk.
+    """
+    cut_points = sorted((start + end) / 2 for start, end in silences)
+    chunks = []
+    chunk_start = 0.0
+    while duration - chunk_start > max_seconds:
+        limit = chunk_start + max_seconds
+        candidates = [point for point in cut_points if chunk_start + max_seconds / 2 < point <= limit]
+        chunk_end = candidates[-1] if candidates else limit
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end
+    chunks.append((chunk_start, duration))
+    return chunks
+
+
+def cut_chunk(audio_path, start: float, end: float) -> str:
+    """
+    Copy the [start, end] segment of the audio file to its own file, without re-encoding.
+    """
+    chunk_path = os.path.join(DOWNLOAD_FOLDER, f'{uuid.uuid4()}{os.path.splitext(str(audio_path))[1]}')
+    (
+        ffmpeg
+        .input(str(audio_path), ss=start, t=end - start)
+        .output(chunk_path, c='copy')
+        .global_args('-loglevel', 'error')
+        .run(overwrite_output=True)
+    )
+    return chunk_path
+
+
+def transcribe_file(audio_path) -> str:
+    return transcription(audio_path, model='whisper-1').text
+
+
+def transcribe_chunk(audio_path, index: int, start: float, end: float) -> str:
+    """
+    Cut and transcribe one chunk; a failed chunk is retried on its own.
+    """
+    chunk_path = cut_chunk(audio_path, start, end)
+    try:
+        for attempt in range(WHISPER_CHUNK_RETRIES + 1):
+            try:
+                return transcribe_file(chunk_path)
+            except Exception as e:
+                if attempt == WHISPER_CHUNK_RETRIES:
+                    raise
+                logger.warning(f"Transcription of chunk {index} failed ({e}), retrying ({attempt + 1}/{WHISPER_CHUNK_RETRIES})")
+                time.sleep(2 ** attempt + random.uniform(0, 1))
+    finally:
+        if os.path.exists(chunk_path):
+            os.remove(chunk_path)
+
+
+def transcribe_audio(audio_path, max_seconds: float = WHISPER_CHUNK_SECONDS, parallelism: int = WHISPER_PARALLELISM) -> str:
+    """
+    Transcribe an audio file with Whisper.
+
+    Audio longer than `max_seconds` is split on silences into bounded chunks that are transcribed
+    concurrently, and the texts are stitched back in order.
+    """
+    media_info = probe_media(audio_path)
+    duration = media_info.duration if media_info else None
+    if not duration or duration <= max_seconds:
+        return transcribe_file(audio_path)
+
+    chunks = plan_chunks(duration, detect_silences(audio_path), max_seconds)
+    logger.info(f"Transcribing {duration:.0f}s of audio in {len(chunks)} chunks")
+    record_metric('transcript.chunks', len(chunks))
+    # Stages run in a copy of the task context, so the metrics recorded by the chunks are kept
+    with StageExecutor(max_workers=parallelism, name='whisper') as executor:
+        for index, (start, end) in enumerate(chunks):
+            executor.submit(f'transcribe_chunk_{index}', transcribe_chunk, audio_path, index, start, end)
+        texts = [executor.result(f'transcribe_chunk_{index}') for index in range(len(chunks))]
+    return ' '.join(text.strip() for text in texts if text)
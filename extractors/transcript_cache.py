@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+
+from redis.exceptions import RedisError
+
+from app.extensions import get_redis
+from app.utils.stats import increment_stat
+from utils.settings import BASE_DIR
+from utils.task_metrics import record_metric
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_CACHE_TTL = int(os.getenv('TRANSCRIPT_CACHE_TTL', 30 * 24 * 3600))
+TRANSCRIPT_CACHE_DIR = BASE_DIR / 'downloads' / 'transcript_cache'
+TRANSCRIPT_CACHE_MAX_FILES = int(os.getenv('TRANSCRIPT_CACHE_MAX_FILES', 5000))
+FINGERPRINT_CHUNK_SIZE = 1024 * 1024
+
+
+def audio_fingerprint(audio_path) -> str | None:
+    """
+    Hash of the conditioned audio file.
+
+    The file is encoded bit-exactly (see condition_audio), so the same audio gives the same
+    fingerprint whatever the container, codec or URL of the video it came from.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    try:
+        with open(audio_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(FINGERPRINT_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    except OSError as e:
+        logger.error(f"Could not fingerprint the audio of {audio_path}: {e}")
+        return None
+    return digest.hexdigest()
+
+
+def _cache_file(fingerprint: str):
+    return TRANSCRIPT_CACHE_DIR / f'{fingerprint}.txt'
+
+
+def get_cached_transcript(fingerprint: str) -> str | None:
+    """
+    Transcript stored for this audio fingerprint, counting hits and misses.
+    """
+    transcript = None
+    client = get_redis()
+    if client is not None:
+        try:
+            transcript = client.get(f'transcript:{fingerprint}')
+        except RedisError as e:
+            logger.error(f"Transcript cache read failed: {e}")
+    else:
+        cache_file = _cache_file(fingerprint)
+        try:
+            transcript = cache_file.read_text(encoding='utf-8')
+            os.utime(cache_file)  # keep recently used transcripts from eviction
+        except OSError:
+            pass
+
+    outcome = 'hit' if transcript is not None else 'miss'
+    increment_stat(f'transcript_cache.{outcome}')
+    record_metric('transcript_cache', outcome)
+    return transcript
+
+
+def store_transcript(fingerprint: str, transcript: str) -> None:
+    client = get_redis()
+    if client is not None:
+        try:
+            client.set(f'transcript:{fingerprint}', transcript, ex=TRANSCRIPT_CACHE_TTL)
+        except RedisError as e:
+            logger.error(f"Transcript cache write failed: {e}")
+        return
+
+    try:
+        os.makedirs(TRANSCRIPT_CACHE_DIR, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=TRANSCRIPT_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w', encoding='utf-8') as file:
+            file.write(transcript)
+        os.replace(temp_path, _cache_file(fingerprint))
+    except OSError as e:
+        logger.error(f"Transcript cache write failed: {e}")
+        return
+    cached_files = sorted(TRANSCRIPT_CACHE_DIR.glob('*.txt'), key=lambda path: path.stat().st_mtime)
+    for stale_file in cached_files[:max(0, len(cached_files) - TRANSCRIPT_CACHE_MAX_FILES)]:
+        stale_file.unlink(missing_ok=True)
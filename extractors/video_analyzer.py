@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import base64
 import logging
 import math
 import os
@@ -8,43 +7,100 @@ import tempfile
 import uuid
 
 import cv2
-from openai import OpenAI
-from pydub import AudioSegment
+import ffmpeg
 
+from extractors.frame_sampler import deduplicate_frames
+from extractors.frame_sampler import encode_frames
+from extractors.frame_sampler import select_scene_frames
 from extractors.recipe_extractor_website import group_markdown_to_json
+from extractors.structured_recipe import extract_recipe_json
+from extractors.structured_recipe import RECIPE_JSON_INSTRUCTIONS
+from extractors.structured_recipe import resolve_extraction_mode
+from extractors.transcriber import transcribe_audio
+from extractors.transcript_cache import audio_fingerprint
+from extractors.transcript_cache import get_cached_transcript
+from extractors.transcript_cache import store_transcript
+from utils.llm_gateway import chat_completion
+from utils.media_info import probe_media
+from utils.pipeline import StageExecutor
 from utils.settings import BASE_DIR
+from utils.task_metrics import record_metric
 
 logger = logging.getLogger(__name__)
-client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'), organization=os.environ.get('OPENAI_ORGANIZATION'))
 
+VIDEO_PIPELINE_WORKERS = int(os.getenv('VIDEO_PIPELINE_WORKERS', 2))
+NO_TRANSCRIPT = 'No Transcript available, do not mention this in the final recipe.'
+AUDIO_TEMPO = float(os.getenv('AUDIO_TEMPO', 1.0))
+AUDIO_BITRATE = os.getenv('AUDIO_BITRATE', '16k')
+AUDIO_SILENCE_THRESHOLD = os.getenv('AUDIO_SILENCE_THRESHOLD', '-40dB')
+AUDIO_SILENCE_SECONDS = float(os.getenv('AUDIO_SILENCE_SECONDS', 1.0))
 
-# Function to split video and audio
-def split_video_audio(video_path):
-    # Use pydub to extract and reduce the quality of the audio file
 
-    try:
-        # Use pydub to extract and reduce the quality of the audio file
-        audio = AudioSegment.from_file(video_path)
-        reduced_audio = audio.set_frame_rate(22050).set_channels(1).set_sample_width(2)  # Reduce quality
+def condition_audio(video_path, output_path):
+    """
+    Extract the speech of the video as low-bitrate mono Opus, entirely inside ffmpeg.
+
+    Silences longer than AUDIO_SILENCE_SECONDS are cut out (energy-based voice activity),
+    and the tempo is optionally sped up by AUDIO_TEMPO before encoding. The output is bit-exact
+    (fixed Ogg serial number, no encoder tag) so that it can be fingerprinted.
+    """
+    audio = (
+        ffmpeg
+        .input(str(video_path))
+        .audio
+        .filter('silenceremove', start_periods=1, start_threshold=AUDIO_SILENCE_THRESHOLD,
+                stop_periods=-1, stop_duration=AUDIO_SILENCE_SECONDS, stop_threshold=AUDIO_SILENCE_THRESHOLD)
+    )
+    if AUDIO_TEMPO != 1.0:
+        audio = audio.filter('atempo', AUDIO_TEMPO)
+    (
+        ffmpeg
+        .output(audio, str(output_path), acodec='libopus', audio_bitrate=AUDIO_BITRATE, ac=1, ar=16000,
+                application='voip', format='ogg', fflags='+bitexact', flags='+bitexact')
+        .global_args('-loglevel', 'error')
+        .run(overwrite_output=True)
+    )
 
-        audio_temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-        reduced_audio.export(audio_temp_file.name, format='mp3', bitrate='32k')  # Export as mp3
 
-        return video_path, audio_temp_file.name
+# Function to split video and audio
+def split_video_audio(video_path):
+    audio_path = None
+    keep_audio = False
+    try:
+        audio_temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.ogg')
+        audio_temp_file.close()
+        audio_path = audio_temp_file.name
+        condition_audio(video_path, audio_path)
+
+        source_info = probe_media(video_path)
+        conditioned_info = probe_media(audio_path)
+        source_audio = source_info.audio_stream if source_info else None
+        source_seconds = (source_audio.duration or source_info.duration) if source_audio else None
+        conditioned_seconds = conditioned_info.duration if conditioned_info else None
+        logger.info(f"Audio conditioned from {source_seconds}s to {conditioned_seconds}s")
+        record_metric('audio.source_seconds', source_seconds)
+        record_metric('audio.conditioned_seconds', conditioned_seconds)
+        if source_seconds and conditioned_seconds is not None:
+            record_metric('audio.duration_reduction', round(1 - conditioned_seconds / source_seconds, 3))
+
+        if not conditioned_seconds:
+            # Nothing but silence
+            return None, None
+        keep_audio = True
+        return video_path, audio_path
     except Exception as e:
         logger.error(f"An error occurred while splitting video and audio: {e}")
         return None, None
+    finally:
+        # The audio file is handed to the caller only on success
+        if audio_path and not keep_audio and os.path.exists(audio_path):
+            os.remove(audio_path)
 
 
 # Function to extract transcript using OpenAI Whisper
 def extract_transcript(audio_file_path):
     try:
-        with open(audio_file_path, 'rb') as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model='whisper-1',
-                file=audio_file
-            )
-        return transcript.text
+        return transcribe_audio(audio_file_path)
     except Exception as e:
         logger.error(f"An error occurred while extracting the transcript: {e}")
         return None
@@ -58,50 +114,64 @@ def calculate_frame_step(video_length_seconds, max_frames=60):
         return max(1, math.ceil(video_length_seconds / max_frames))
 
 
-# Function to encode frame
-def encode_frame(frame):
-    _, buffer = cv2.imencode('.jpg', frame)
-    return base64.b64encode(buffer).decode('utf-8')
-
-
-# Function to get video frames as base64
-def get_video_frames(video_path):
+def save_recipe_image(video_path, recipe_img):
+    """
+    Save the first frame of the video as the recipe image, at full resolution.
+    """
     video = cv2.VideoCapture(video_path)
-    frame_rate = video.get(cv2.CAP_PROP_FPS)
-    frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-    video_length_seconds = frame_count / frame_rate
+    try:
+        success, frame_img = video.read()
+        if success:
+            cv2.imwrite(str(recipe_img), frame_img)
+        return success
+    finally:
+        video.release()
 
-    frame_step = calculate_frame_step(video_length_seconds)
 
-    logger.info(f"Video Frame Rate: {frame_rate}")
-    logger.info(f"Total Frame Count: {frame_count}")
-    logger.info(f"Video Length (seconds): {video_length_seconds}")
+def sample_frames_by_seek(video_path, video_length_seconds):
+    """
+    Fallback sampling: seek to every Nth second of the video.
+    """
+    frame_step = calculate_frame_step(video_length_seconds)
     logger.info(f"Calculated Frame Step: {frame_step}")
-    #  Save the final frame as 'recipe_image.jpg' locally
-    video.set(cv2.CAP_PROP_POS_FRAMES, frame_count - frame_count)
-    success, frame_img = video.read()
-
-    recipe_img = BASE_DIR / 'downloads' / f'{uuid.uuid4()}_recipe_img.jpg'
-    base64Frames = []
+    video = cv2.VideoCapture(video_path)
+    frames = []
     for second in range(0, int(video_length_seconds), frame_step):
         video.set(cv2.CAP_PROP_POS_MSEC, second * 1000)
         success, frame = video.read()
         if success:
-            base64Frames.append(encode_frame(frame))
+            frames.append(frame)
+    video.release()
+    return frames
 
-    #  change_extension_to_image(video_path)
-    if success:
-        cv2.imwrite(recipe_img, frame_img)
 
-    video.release()
+# Function to get video frames as base64
+def get_video_frames(video_path):
+    media_info = probe_media(video_path)
+    if media_info is None or media_info.video_stream is None:
+        raise ValueError(f"No video stream found in {video_path}")
+    video_length_seconds = media_info.video_duration or 0
+
+    logger.info(f"Video Frame Rate: {media_info.frame_rate}")
+    logger.info(f"Total Frame Count: {media_info.frame_count}")
+    logger.info(f"Video Length (seconds): {video_length_seconds}")
+
+    recipe_img = BASE_DIR / 'downloads' / f'{uuid.uuid4()}_recipe_img.jpg'
+    save_recipe_image(video_path, recipe_img)
+
+    frames = select_scene_frames(video_path, media_info)
+    if frames is None:
+        frames = sample_frames_by_seek(video_path, video_length_seconds)
+    frames = deduplicate_frames(frames)
+    base64Frames = encode_frames(frames)
+
     logger.info(f"Number of Frames Captured: {len(base64Frames)}")
     return recipe_img, base64Frames
 
 
 def has_audio(video_path: str) -> bool:
     """
-    Check for audio using pydub.
-    Good for audio processing but requires FFmpeg.
+    Check for a non-empty audio stream from the probed metadata, without decoding it.
 
     Args:
         video_path: Path to the video file
@@ -109,12 +179,8 @@ def has_audio(video_path: str) -> bool:
     Returns:
         bool: True if video has audio, False otherwise
     """
-    try:
-        audio = AudioSegment.from_file(video_path)
-        return len(audio) > 0
-    except Exception as e:
-        print(f"Pydub Error: {str(e)}")
-        return False
+    media_info = probe_media(video_path)
+    return bool(media_info and media_info.has_audio)
 
 
 # def has_audio(video_path):
@@ -129,7 +195,72 @@ def has_audio(video_path: str) -> bool:
 #         return False
 
 
-def process_video(video_path):
+def transcribe_video_audio(video_path):
+    """
+    Extract the audio track of the video and transcribe it with Whisper.
+
+    Returns:
+        str: The transcript, or a placeholder when the video has no usable audio.
+    """
+    if not has_audio(video_path):
+        logger.info('No audio track found in the video.')
+        return NO_TRANSCRIPT
+
+    video_clip_path, audio_clip_path = split_video_audio(video_path)
+    logger.info('{} and audio {}'.format(video_clip_path, audio_clip_path))
+    if not audio_clip_path:
+        return NO_TRANSCRIPT
+    try:
+        # Reposts, retries and the same clip under another URL share their conditioned audio:
+        # fingerprinting the file it was already decoded to costs no second decode
+        fingerprint = audio_fingerprint(audio_clip_path)
+        if fingerprint:
+            transcript = get_cached_transcript(fingerprint)
+            if transcript is not None:
+                return transcript
+        transcript = extract_transcript(audio_clip_path)
+        if fingerprint and transcript:
+            store_transcript(fingerprint, transcript)
+        return transcript
+    finally:
+        if os.path.exists(audio_clip_path):
+            os.remove(audio_clip_path)
+
+
+def frame_parts(base_64_frames) -> list[dict]:
+    return [
+        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{frame}", "detail": "low"}}
+        for frame in base_64_frames
+    ]
+
+
+def extract_video_recipe_structured(transcript, base_64_frames) -> str | None:
+    """
+    Read the recipe straight into its JSON shape from the transcript and the frames, in one call.
+    """
+    messages = [
+        {
+            "role": "system",
+            "content": (
+                "You are a video recipe summarizer. "
+                "You get information from the video: recipe title, servings, total time, ingredients, directions. "
+                "You will ALWAYS supply ingredient amounts. Make sure to analyze the transcript and the frames holistically. "
+                + RECIPE_JSON_INSTRUCTIONS
+            ),
+        },
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": f"Here is a full transcript of the video: {transcript}.\n"
+                                         "These are some of the frames from the video."},
+                *frame_parts(base_64_frames),
+            ],
+        },
+    ]
+    return extract_recipe_json(messages, model='gpt-4o-mini', max_tokens=4000)
+
+
+def process_video(video_path, mode: str = None):
     try:
         description = ''
         # filename = os.path.basename(video_path)
@@ -137,20 +268,20 @@ def process_video(video_path):
         # recipe_img = ''
         # video = VideoFileClip(video_path)
 
-        if not has_audio(video_path):
-            logger.info('No audio track found in the video.')
-            transcript = 'No Transcript available, do not mention this in the final recipe.'
-        else:
-            video_clip_path, audio_clip_path = split_video_audio(video_path)
-            logger.info('{} and audio {}'.format(video_clip_path, audio_clip_path))
-            # print(video_path, audio_clip_path)
-            if audio_clip_path:
-                transcript = extract_transcript(audio_clip_path)
-            else:
-                transcript = 'No Transcript available, do not mention this in the final recipe.'
-
-        recipe_img, base_64_frames = get_video_frames(video_path)
+        # The audio branch (extraction + Whisper) and the frame branch (sampling + encoding)
+        # only meet at the final GPT call, so run them side by side.
+        with StageExecutor(max_workers=VIDEO_PIPELINE_WORKERS, name='process_video') as stages:
+            stages.submit('transcript', transcribe_video_audio, video_path)
+            stages.submit('frames', get_video_frames, video_path)
+            transcript = stages.result('transcript')
+            recipe_img, base_64_frames = stages.result('frames')
         logger.info('{} and audio \n and transcript ')
+        if resolve_extraction_mode(mode) == 'structured':
+            recipe_info = extract_video_recipe_structured(transcript, base_64_frames)
+            if recipe_info is not None:
+                return recipe_info, recipe_img
+
+        record_metric('recipe.extraction_mode', 'two_pass')
         prompt_messages = [
             {
                 "role": "user",
@@ -160,9 +291,7 @@ def process_video(video_path):
                     f"Here is a full transcript of the video: {transcript}.\n"
                     "If there is no content to review, do not make up a recipe, instead output this: 'Cannot identify Recipe. Please try again with another link.'"
                     "These are descriptions of some of the frames from the video. Make sure to analyze the transcript and the frames holistically.",
-                    *map(lambda x: {"type": "image_url",
-                                    "image_url": {"url": f"data:image/jpeg;base64,{x}", "detail": "low"}},
-                         base_64_frames),
+                    *frame_parts(base_64_frames),
                 ],
             },
         ]
@@ -173,7 +302,7 @@ def process_video(video_path):
             'max_tokens': 2000,
         }
 
-        result = client.chat.completions.create(**params)
+        result = chat_completion(**params)
         description = result.choices[0].message.content
         description_1 = result.choices[0].message.content
         logger.info(description)
@@ -4,6 +4,9 @@ import requests
 import re
 
 from utils.common import save_video_to_file
+from utils.downloader import DownloadTooLargeError
+from utils.downloader import remove_scratch_file
+from utils.downloader import stream_download
 
 logger = logging.getLogger(__name__)
 
@@ -60,15 +63,17 @@ def download_twitter_video(url, output_filename="downloaded_video.mp4"):
         return
 
     # Step 5: Download the MP4 video
+    scratch_path = None
     try:
-        video_response = requests.get(second_highest_resolution_url, stream=True)
-        if video_response.status_code != 200:
-            logger.info("Failed to download the video.")
-            return None
-        video_buffer = video_response.content
-        return save_video_to_file(video_buffer)
+        scratch_path = stream_download(second_highest_resolution_url)
+        return save_video_to_file(scratch_path)
+    except DownloadTooLargeError as e:
+        logger.info(f"Video rejected, too large: {e}")
+        return None
     except Exception as e:
         logger.info(f"Error downloading video: {e}")
+    finally:
+        remove_scratch_file(scratch_path)
 
 
 # # Example usage:
@@ -1,10 +1,10 @@
 import os
 import uuid
-import ffmpeg
 import yt_dlp
 import sys
 import logging
 from utils.common import DOWNLOAD_FOLDER, convert_video_to_mp4
+from utils.media_info import probe_media
 
 # Configure logging
 logging.basicConfig(
@@ -64,13 +64,11 @@ def get_video_format(input_video_path: str) -> str:
     """
     Récupère le format de la vidéo à partir de ses métadonnées.
     """
-    try:
-        probe = ffmpeg.probe(input_video_path)
-        format_name = probe['format']['format_name']
-        return format_name
-    except ffmpeg.Error as e:
-        print(f"Erreur lors de l'analyse du fichier vidéo : {e}")
+    media_info = probe_media(input_video_path)
+    if media_info is None:
+        print(f"Erreur lors de l'analyse du fichier vidéo : {input_video_path}")
         return None
+    return media_info.format_name
 
 
 
@@ -0,0 +1,128 @@
+"""add canonical origin key to recipes
+
+Revision ID: a3c9e7d41f20
+Revises: c796a00bfb3c
+Create Date: 2026-10-18 09:12:44.518203
+
+"""
+import re
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9e7d41f20'
+down_revision = 'c796a00bfb3c'
+branch_labels = None
+depends_on = None
+
+# A copy of utils.canonical_url as of this revision (short links are not resolved): the backfill must
+# not change when the application code does
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid', 'igsh', 'si', 'feature',
+    'is_copy_url', 'is_from_webapp', 'sender_device', 'sender_web_id', 'share_app_id', 'share_item_id',
+    'share_link_id', 'social_sharing', 'ref_src', 'ref_url', 'mibextid', 'rdid', 'share_url',
+    '_r', '_t',
+}
+REF_TRACKING_DOMAINS = ('tiktok.com', 'youtube.com', 'instagram.com', 'x.com', 'twitter.com', 'facebook.com',
+                        'pinterest.com', 'reddit.com')
+TIKTOK_ID_REGEX = re.compile(r'/(?:video|photo|v)/(\d+)')
+YOUTUBE_ID_REGEX = re.compile(r'(?:[?&]v=|/(?:vi|v|shorts|embed|live)/|youtu\.be/)([A-Za-z0-9_-]{11})')
+INSTAGRAM_CODE_REGEX = re.compile(r'/(?:p|reel|reels|tv)/([A-Za-z0-9_-]+)')
+TWEET_ID_REGEX = re.compile(r'/status(?:es)?/(\d+)')
+FACEBOOK_ID_REGEX = re.compile(r'/(?:reel|videos|watch/live|share/r|share/v)/(?:[^/]+/)*?(\d{6,})')
+FACEBOOK_QUERY_ID_KEYS = ('v', 'story_fbid', 'video_id')
+
+
+def _is_host(host, domain):
+    return host == domain or host.endswith(f'.{domain}')
+
+
+def _normalize_website_url(url):
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[len('www.'):]
+    path = re.sub(r'/{2,}', '/', parts.path or '/')
+    if len(path) > 1:
+        path = path.rstrip('/')
+    ignored = TRACKING_PARAMS | {'ref'} if any(_is_host(host, domain) for domain in REF_TRACKING_DOMAINS) else TRACKING_PARAMS
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=False)
+        if key.lower() not in ignored and not key.lower().startswith('utm_')
+    )
+    normalized = f'{host}{path}'
+    if query:
+        normalized = f'{normalized}?{urlencode(query)}'
+    return normalized
+
+
+def _origin_key(url):
+    url = (url or '').strip()
+    if not url:
+        return url
+    if '://' not in url:
+        url = f'https://{url}'
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    for prefix in ('www.', 'm.', 'mobile.', 'web.', 'mbasic.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    path = parts.path
+    query = dict(parse_qsl(parts.query))
+
+    if _is_host(host, 'tiktok.com'):
+        match = TIKTOK_ID_REGEX.search(path)
+        if match:
+            return f'tiktok:{match.group(1)}'
+        if query.get('item_id', '').isdigit():
+            return f"tiktok:{query['item_id']}"
+    elif _is_host(host, 'youtube.com') or host == 'youtu.be':
+        match = YOUTUBE_ID_REGEX.search(f'{host}{path}?{parts.query}')
+        if match:
+            return f'youtube:{match.group(1)}'
+    elif _is_host(host, 'instagram.com'):
+        match = INSTAGRAM_CODE_REGEX.search(path)
+        if match:
+            return f'instagram:{match.group(1)}'
+    elif _is_host(host, 'x.com') or _is_host(host, 'twitter.com'):
+        match = TWEET_ID_REGEX.search(path)
+        if match:
+            return f'x:{match.group(1)}'
+    elif _is_host(host, 'facebook.com'):
+        match = FACEBOOK_ID_REGEX.search(path)
+        if match:
+            return f'facebook:{match.group(1)}'
+        for key in FACEBOOK_QUERY_ID_KEYS:
+            if query.get(key, '').isdigit():
+                return f'facebook:{query[key]}'
+
+    return f'website:{_normalize_website_url(url)}'[:255]
+
+
+def upgrade():
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('origin_key', sa.String(length=255), nullable=True))
+        batch_op.create_index(batch_op.f('ix_recipes_origin_key'), ['origin_key'], unique=False)
+
+    # Backfill the key of the existing recipes (short links are not resolved here)
+    connection = op.get_bind()
+    recipes = sa.table('recipes', sa.column('id', sa.String), sa.column('origin', sa.String),
+                       sa.column('origin_key', sa.String))
+    for recipe_id, origin in connection.execute(sa.select(recipes.c.id, recipes.c.origin)).fetchall():
+        connection.execute(
+            recipes.update().where(recipes.c.id == recipe_id).values(
+                origin_key=_origin_key(origin)
+            )
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_recipes_origin_key'))
+        batch_op.drop_column('origin_key')
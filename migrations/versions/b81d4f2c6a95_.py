@@ -0,0 +1,30 @@
+"""add ingredient nutrition memo table
+
+Revision ID: b81d4f2c6a95
+Revises: a3c9e7d41f20
+Create Date: 2026-10-18 14:03:27.190442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81d4f2c6a95'
+down_revision = 'a3c9e7d41f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ingredient_nutrition_memo',
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('nutrients', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('ingredient_nutrition_memo')
@@ -0,0 +1,27 @@
+"""add parsed ingredients to recipes
+
+Revision ID: c4e2a9d17b3f
+Revises: b81d4f2c6a95
+Create Date: 2026-10-18 15:41:09.662017
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e2a9d17b3f'
+down_revision = 'b81d4f2c6a95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows are filled by `flask backfill-parsed-ingredients`
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('parsed_ingredients', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        batch_op.drop_column('parsed_ingredients')
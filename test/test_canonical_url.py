@@ -0,0 +1,24 @@
+from utils.canonical_url import canonicalize_origin
+
+
+def test_canonicalize_video_platforms():
+    assert canonicalize_origin(
+        'https://www.tiktok.com/@tiktok/video/7106594312292453675?is_copy_url=1&is_from_webapp=v1',
+        resolve_short_links=False
+    ) == canonicalize_origin('https://www.tiktok.com/@tiktok/video/7106594312292453675?lang=en') == 'tiktok:7106594312292453675'
+    assert canonicalize_origin('https://youtu.be/1LzFy7Rr89E?si=abc') == 'youtube:1LzFy7Rr89E'
+    assert canonicalize_origin('https://www.youtube.com/watch?v=1LzFy7Rr89E&t=3') == 'youtube:1LzFy7Rr89E'
+    assert canonicalize_origin('https://youtube.com/shorts/1LzFy7Rr89E') == 'youtube:1LzFy7Rr89E'
+    assert canonicalize_origin('https://www.instagram.com/reel/C9abcDEF_12/?igsh=xx') == 'instagram:C9abcDEF_12'
+    assert canonicalize_origin('https://x.com/someone/status/1850919444387647949?s=20') == 'x:1850919444387647949'
+    assert canonicalize_origin('https://m.facebook.com/watch/?v=123456789012') == 'facebook:123456789012'
+
+
+def test_canonicalize_website():
+    assert canonicalize_origin('HTTP://WWW.Example.com/recipes/cake/?utm_source=x&b=2&a=1#top') == \
+        'website:example.com/recipes/cake?a=1&b=2'
+
+
+def test_ref_is_kept_outside_known_platforms():
+    assert canonicalize_origin('https://example.com/recipe?ref=12') == 'website:example.com/recipe?ref=12'
+    assert canonicalize_origin('https://www.pinterest.com/pin/1/?ref=share') == 'website:pinterest.com/pin/1'
@@ -0,0 +1,39 @@
+from bs4 import BeautifulSoup
+
+from extractors.content_extractor import extract_main_content
+
+PAGE = """
+<html><body>
+  <nav><a href="/">Home</a><a href="/recipes">Recipes</a></nav>
+  <div class="sidebar-widget"><p>Sign up to our newsletter, get weekly recipes, tips and more.</p></div>
+  <div class="post-content">
+    <p>These pancakes are fluffy, light, and ready in twenty minutes, perfect for a lazy Sunday morning.</p>
+    <p>Serve them warm with maple syrup, fresh berries, or a spoonful of yogurt on the side.</p>
+    <div class="recipe-card">
+      <ul class="ingredients"><li>1 cup flour</li><li>2 <span>eggs</span></li><li>1 cup milk</li></ul>
+      <ol class="instructions"><li>Whisk the flour, eggs and milk until smooth.</li><li>Fry in a hot pan, 2 minutes per side.</li></ol>
+    </div>
+  </div>
+  <div id="comments"><p>Great recipe, my kids loved these pancakes, will make them again!</p></div>
+  <footer><p>Copyright, all rights reserved, example recipes.</p></footer>
+</body></html>
+"""
+
+
+def test_extract_main_content():
+    content = extract_main_content(BeautifulSoup(PAGE, 'html.parser'))
+    lines = content.splitlines()
+    assert '1 cup flour' in lines
+    assert 'Fry in a hot pan, 2 minutes per side.' in lines
+    assert lines.count('2 eggs') == 1
+    assert 'newsletter' not in content
+    assert 'kids loved' not in content
+    assert 'Copyright' not in content
+    assert 'Recipes' not in lines
+
+
+def test_page_wrapped_in_a_form():
+    page = PAGE.replace('<body>', '<body><form id="aspnetForm">').replace('</body>', '</form></body>')
+    content = extract_main_content(BeautifulSoup(page, 'html.parser'))
+    assert '1 cup flour' in content.splitlines()
+    assert 'newsletter' not in content
@@ -0,0 +1,14 @@
+from utils.html_parser import extract_script_json
+
+PAGE = (
+    '<html><head><script data-id="SIGI_STATE">ignored</script>'
+    '<script id="SIGI_STATE" type="application/json">{"ItemModule": {"1": {"desc": "</p>"}}}</script>'
+    '<script id=__UNIVERSAL_DATA_FOR_REHYDRATION__>{"__DEFAULT_SCOPE__": {}}</script></head></html>'
+)
+
+
+def test_extract_script_json():
+    assert extract_script_json(PAGE, 'SIGI_STATE') == {'ItemModule': {'1': {'desc': '</p>'}}}
+    assert extract_script_json(PAGE.encode(), 'SIGI_STATE') == {'ItemModule': {'1': {'desc': '</p>'}}}
+    assert extract_script_json(PAGE, '__UNIVERSAL_DATA_FOR_REHYDRATION__') == {'__DEFAULT_SCOPE__': {}}
+    assert extract_script_json(PAGE, 'SIGI') is None
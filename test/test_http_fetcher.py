@@ -0,0 +1,25 @@
+from utils import http_fetcher
+from utils.http_fetcher import TokenBucket
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=2, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0.4 < bucket.reserve() <= 0.5
+    assert 0.9 < bucket.reserve() <= 1.0
+
+
+def test_token_bucket_refuses_long_waits_without_taking_a_token():
+    bucket = TokenBucket(rate=2, capacity=1)
+    assert bucket.reserve() == 0
+    assert bucket.reserve(max_wait=0.1) is None
+    assert 0.4 < bucket.reserve(max_wait=1) <= 0.5
+
+
+def test_scrapeninja_needs_a_key(monkeypatch):
+    monkeypatch.delenv('RESIDENTIAL_PROXY_HOST', raising=False)
+    monkeypatch.setattr(http_fetcher, 'SCRAPENINJA_API_KEY', None)
+    assert [name for name, _, _ in http_fetcher.fetch_strategies()] == ['direct']
+    monkeypatch.setattr(http_fetcher, 'SCRAPENINJA_API_KEY', 'key')
+    assert [name for name, _, _ in http_fetcher.fetch_strategies()] == ['direct', 'scrapeninja']
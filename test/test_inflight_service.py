@@ -0,0 +1,51 @@
+from app.services import inflight_service
+from app.services.inflight_service import InflightRecipeService
+
+
+class FakeRedis:
+    """
+    The few Redis calls of the in-flight scripts, run in Python.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+
+    def eval(self, script, numkeys, *args):
+        keys, argv = args[:numkeys], args[numkeys:]
+        if script == inflight_service.CLAIM_SCRIPT:
+            if keys[0] in self.values:
+                return 0
+            self.values[keys[0]] = argv[0]
+            self.sets.setdefault(keys[1], set()).add(argv[1])
+            return 1
+        if script == inflight_service.ATTACH_SCRIPT:
+            if keys[0] not in self.values:
+                return None
+            self.sets.setdefault(keys[1], set()).add(argv[0])
+            return self.values[keys[0]]
+        if script == inflight_service.RELEASE_SCRIPT:
+            if self.values.get(keys[0], argv[0]) != argv[0]:
+                return []
+            self.values.pop(keys[0], None)
+            return list(self.sets.pop(keys[1], set()))
+        raise AssertionError('unexpected script')
+
+
+def test_submitter_linked_when_waiter_polls_first(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(inflight_service, 'get_redis', lambda: client)
+    linked = []
+    monkeypatch.setattr(inflight_service.RecipeCelService, 'link_recipe_to_user',
+                        lambda user_id, is_authenticated, recipe: linked.append((user_id, is_authenticated)))
+    recipe = object()
+
+    assert InflightRecipeService.claim('tiktok:1', 'task-1', 'submitter', True)
+    assert InflightRecipeService.attach('tiktok:1', 'waiter', False) == 'task-1'
+
+    # The waiter polls first: the recipe is stored and every waiter is linked
+    InflightRecipeService.complete('tiktok:1', 'task-1', recipe)
+    # The submitter polls later: the recipe is found, nothing is left to link
+    InflightRecipeService.complete('tiktok:1', 'task-1', recipe)
+
+    assert sorted(linked) == [('submitter', True), ('waiter', False)]
@@ -0,0 +1,50 @@
+from fractions import Fraction
+
+from utils.ingredient_parser import parse_ingredient
+from utils.ingredient_parser import parse_ingredient_groups
+
+
+def test_parse_quantity_unit_and_name():
+    parsed = parse_ingredient('1 1/2 cups all-purpose flour, sifted')
+    assert (parsed.quantity, parsed.unit, parsed.name) == (Fraction(3, 2), 'cup', 'all-purpose flour')
+    assert parsed.text[slice(*parsed.name_span)] == 'all-purpose flour'
+
+    assert parse_ingredient('½ tsp salt').quantity == Fraction(1, 2)
+    assert parse_ingredient('200g butter').unit == 'g'
+    assert parse_ingredient('3 T sugar').unit == 'tbsp'
+    assert parse_ingredient('a pinch of nutmeg').name == 'nutmeg'
+
+
+def test_parse_ranges_containers_and_colon_lines():
+    parsed = parse_ingredient('2-3 cloves garlic, minced')
+    assert (parsed.quantity, parsed.quantity_max, parsed.unit, parsed.name) == (2, 3, 'clove', 'garlic')
+
+    parsed = parse_ingredient('1 (14 oz) can diced tomatoes')
+    assert (parsed.quantity, parsed.unit, parsed.name) == (14, 'oz', 'diced tomatoes')
+
+    parsed = parse_ingredient('1 cup (240 ml) milk')
+    assert (parsed.quantity, parsed.unit, parsed.name) == (1, 'cup', 'milk')
+
+    parsed = parse_ingredient('1 can (14 oz) diced tomatoes')
+    assert (parsed.quantity, parsed.unit, parsed.name) == (14, 'oz', 'diced tomatoes')
+
+    parsed = parse_ingredient('Flour: 200 g')
+    assert (parsed.quantity, parsed.unit, parsed.name) == (200, 'g', 'Flour')
+
+    parsed = parse_ingredient('Salt to taste')
+    assert (parsed.quantity, parsed.unit, parsed.name) == (None, None, 'Salt')
+
+
+def test_zero_denominator_is_not_a_number():
+    parsed = parse_ingredient('1/0 cup milk')
+    assert (parsed.quantity, parsed.numbers) == (None, ())
+    groups = parse_ingredient_groups([{'title_of_ingredient': 'None', 'list': ['1/0 g flour', '2 eggs']}])
+    assert [line['quantity'] for line in groups[0]['list']] == [None, '2']
+
+
+def test_number_spans_round_trip():
+    parsed = parse_ingredient('1.5 kg potatoes (about 6)')
+    assert [(number.start, number.end, number.value) for number in parsed.numbers] == \
+        [(0, 3, Fraction(3, 2)), (23, 24, Fraction(6))]
+    assert type(parsed).from_dict(parsed.to_dict()) == parsed
+
@@ -0,0 +1,24 @@
+import numpy as np
+
+from extractors.nutrition_engine import FoodTable
+from extractors.nutrition_engine import ingredient_grams
+from utils.ingredient_parser import parse_ingredient
+
+TABLE = FoodTable(
+    foods=['salt', 'onion', 'chicken breast', 'honey'],
+    aliases={'salt': 0, 'onion': 1, 'chicken breast': 2, 'honey': 3},
+    nutrients=np.zeros((4, 7)),
+    grams_per_ml=np.array([1.2, 0.5, np.nan, np.nan]),
+    grams_per_unit=np.array([np.nan, 110.0, np.nan, np.nan]),
+)
+
+
+def test_lines_without_quantity():
+    assert ingredient_grams(parse_ingredient('Salt to taste'), 0, TABLE) == 0.0
+    assert ingredient_grams(parse_ingredient('Onion'), 1, TABLE) == 110.0
+    assert ingredient_grams(parse_ingredient('Chicken breast'), 2, TABLE) is None
+
+
+def test_volume_without_density_is_unresolved():
+    assert ingredient_grams(parse_ingredient('2 tbsp honey'), 3, TABLE) is None
+    assert abs(ingredient_grams(parse_ingredient('1 tsp salt'), 0, TABLE) - 4.929 * 1.2) < 1e-9
@@ -0,0 +1,50 @@
+import os
+import time
+
+import requests
+
+from app.utils import page_cache
+
+
+def test_page_cache_round_trip(monkeypatch, tmp_path):
+    monkeypatch.setattr(page_cache, 'get_redis', lambda: None)
+    monkeypatch.setattr(page_cache, 'PAGE_CACHE_DIR', str(tmp_path))
+    url = 'https://example.com/pancakes'
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.encoding = 'utf-8'
+    response.headers['Content-Type'] = 'text/html'
+    response.headers['ETag'] = '"v1"'
+    response._content = '<html><body>Crêpes</body></html>'.encode()
+
+    assert page_cache.get_cached_page(url) is None
+    page_cache.store_page(url, response)
+    entry = page_cache.get_cached_page(url)
+    assert page_cache.is_fresh(entry)
+    assert page_cache.conditional_headers(entry) == {'If-None-Match': '"v1"'}
+    cached = page_cache.cached_response(entry)
+    assert cached.text == '<html><body>Crêpes</body></html>'
+    assert cached.headers['content-type'] == 'text/html'
+
+
+def test_page_cache_eviction(monkeypatch, tmp_path):
+    monkeypatch.setattr(page_cache, 'get_redis', lambda: None)
+    monkeypatch.setattr(page_cache, 'PAGE_CACHE_DIR', str(tmp_path))
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b'x' * 1000
+
+    page_cache.store_page('https://example.com/old', response)
+    old_file = tmp_path / f"{page_cache._key('https://example.com/old')}.json"
+    entry_size = old_file.stat().st_size
+    stored_at = time.time() - 60
+    os.utime(old_file, (stored_at, stored_at))
+    monkeypatch.setattr(page_cache, 'PAGE_CACHE_DIR_MAX_BYTES', entry_size + 100)
+    page_cache.store_page('https://example.com/new', response)
+    assert not old_file.exists()
+    assert page_cache.get_cached_page('https://example.com/new') is not None
+
+    monkeypatch.setattr(page_cache, 'PAGE_CACHE_TTL', -1)
+    assert page_cache.get_cached_page('https://example.com/new') is None
+    assert list(tmp_path.iterdir()) == []
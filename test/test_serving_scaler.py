@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.serving_scaler import format_mixed_fractions
+from app.services.serving_scaler import QuantityVector
+from app.services.serving_scaler import scaled_variant
+from utils.ingredient_parser import parse_ingredient_groups
+
+INGREDIENTS = [{'title_of_ingredient': 'None', 'list': ['1 1/2 cups flour', '2-3 eggs', '1.5 kg potatoes', 'Salt']}]
+
+
+def test_scale_ranges_and_mixed_fractions():
+    vector = QuantityVector.from_parsed(parse_ingredient_groups(INGREDIENTS))
+    assert vector.scale(6, 4) == [
+        {'title_of_ingredient': 'None', 'list': ['2 1/4 cups flour', '3-4 1/2 eggs', '2 1/4 kg potatoes', 'Salt']},
+    ]
+
+
+def test_scale_factor_one_keeps_lines():
+    vector = QuantityVector.from_parsed(parse_ingredient_groups(INGREDIENTS))
+    assert vector.scale(4, 4) == INGREDIENTS
+
+
+def test_scale_keeps_tokens_too_large_for_int64():
+    ingredients = [{'title_of_ingredient': 'None', 'list': ['12345678901234567890 g sugar', '2 eggs']}]
+    vector = QuantityVector.from_parsed(parse_ingredient_groups(ingredients))
+    assert vector.scale(2, 1)[0]['list'] == ['12345678901234567890 g sugar', '4 eggs']
+
+
+def test_format_mixed_fractions():
+    numerators = np.array([2, 1, 3, -9, 0])
+    denominators = np.array([1, 2, 2, 8, 1])
+    assert format_mixed_fractions(numerators, denominators) == ['2', '1/2', '1 1/2', '-1 1/8', '0']
+
+
+def test_scaled_variant_follows_edits_made_elsewhere():
+    # No update event reaches the cache, as when the recipe is edited by another worker
+    recipe = SimpleNamespace(id='recipe-1', ingredients=INGREDIENTS, parsed_ingredients=None, servings=4,
+                             unit_serving=None)
+    assert scaled_variant(recipe, 8)['ingredients'][0]['list'][1] == '4-6 eggs'
+    recipe.ingredients = [{'title_of_ingredient': 'None', 'list': ['3 eggs']}]
+    assert scaled_variant(recipe, 8)['ingredients'][0]['list'] == ['6 eggs']
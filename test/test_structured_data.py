@@ -0,0 +1,50 @@
+from bs4 import BeautifulSoup
+
+from extractors.structured_data import extract_schema_recipe
+from extractors.structured_data import format_duration
+from extractors.structured_data import map_schema_recipe
+
+
+def test_map_schema_recipe():
+    recipe = map_schema_recipe({
+        '@type': 'Recipe',
+        'name': 'Pancakes &amp; syrup',
+        'recipeYield': ['4', '4 servings'],
+        'totalTime': 'PT1H5M',
+        'image': {'@type': 'ImageObject', 'url': 'https://example.com/pancakes.jpg'},
+        'recipeIngredient': ['1 cup flour', '<b>2</b> eggs'],
+        'recipeInstructions': [
+            {'@type': 'HowToStep', 'text': 'Whisk.'},
+            {'@type': 'HowToSection', 'name': 'Cooking', 'itemListElement': [{'@type': 'HowToStep', 'text': 'Fry.'}]},
+        ],
+    })
+    assert recipe == {
+        'title': 'Pancakes & syrup',
+        'servings': '4',
+        'preparation_time': '1 hour 5 minutes',
+        'ingredients': [{'title_of_ingredient': 'Ingredients', 'list': ['1 cup flour', '2 eggs']}],
+        'directions': [
+            {'title_of_direction': 'Directions', 'list': ['Whisk.']},
+            {'title_of_direction': 'Cooking', 'list': ['Fry.']},
+        ],
+        'image_url': 'https://example.com/pancakes.jpg',
+    }
+    assert map_schema_recipe({'@type': 'Recipe', 'name': 'No ingredients', 'recipeInstructions': 'Wait.'}) is None
+    assert format_duration('PT45M') == '45 minutes'
+
+
+def test_microdata_reads_only_the_recipe_properties():
+    page = """
+    <div itemscope itemtype="https://schema.org/Recipe">
+      <div itemprop="author" itemscope itemtype="https://schema.org/Person"><span itemprop="name">Jane</span></div>
+      <h1 itemprop="name">Pancakes</h1>
+      <li itemprop="recipeIngredient">1 cup flour</li>
+      <div itemprop="recipeInstructions"><li>Whisk.</li><li>Fry.</li></div>
+    </div>
+    """
+    recipe = extract_schema_recipe(BeautifulSoup(page, 'html.parser'))
+    assert recipe['title'] == 'Pancakes'
+    assert recipe['directions'] == [{'title_of_direction': 'Directions', 'list': ['Whisk.', 'Fry.']}]
+
+    untitled = page.replace('<h1 itemprop="name">Pancakes</h1>', '')
+    assert extract_schema_recipe(BeautifulSoup(untitled, 'html.parser')) is None
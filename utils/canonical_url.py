@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import logging
+import re
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+SHORT_LINK_HOSTS = ('vm.tiktok.com', 'vt.tiktok.com', 'fb.watch', 't.co')
+SHORT_LINK_TIMEOUT = 5
+
+# Query parameters that never change the content behind a link
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid', 'igsh', 'si', 'feature',
+    'is_copy_url', 'is_from_webapp', 'sender_device', 'sender_web_id', 'share_app_id', 'share_item_id',
+    'share_link_id', 'social_sharing', 'ref_src', 'ref_url', 'mibextid', 'rdid', 'share_url',
+    '_r', '_t',
+}
+# `ref` is a real parameter on some sites: it is only dropped on the platforms known to use it for tracking
+REF_TRACKING_DOMAINS = ('tiktok.com', 'youtube.com', 'instagram.com', 'x.com', 'twitter.com', 'facebook.com',
+                        'pinterest.com', 'reddit.com')
+
+TIKTOK_ID_REGEX = re.compile(r'/(?:video|photo|v)/(\d+)')
+YOUTUBE_ID_REGEX = re.compile(r'(?:[?&]v=|/(?:vi|v|shorts|embed|live)/|youtu\.be/)([A-Za-z0-9_-]{11})')
+INSTAGRAM_CODE_REGEX = re.compile(r'/(?:p|reel|reels|tv)/([A-Za-z0-9_-]+)')
+TWEET_ID_REGEX = re.compile(r'/status(?:es)?/(\d+)')
+FACEBOOK_ID_REGEX = re.compile(r'/(?:reel|videos|watch/live|share/r|share/v)/(?:[^/]+/)*?(\d{6,})')
+FACEBOOK_QUERY_ID_KEYS = ('v', 'story_fbid', 'video_id')
+
+
+def _host(parts) -> str:
+    host = (parts.hostname or '').lower()
+    for prefix in ('www.', 'm.', 'mobile.', 'web.', 'mbasic.'):
+        if host.startswith(prefix):
+            return host[len(prefix):]
+    return host
+
+
+def _is_host(host: str, domain: str) -> bool:
+    return host == domain or host.endswith(f'.{domain}')
+
+
+def is_short_link(url: str) -> bool:
+    parts = urlsplit(url if '://' in url else f'https://{url}')
+    host = (parts.hostname or '').lower()
+    return host in SHORT_LINK_HOSTS or (host.endswith('tiktok.com') and parts.path.startswith('/t/'))
+
+
+def resolve_short_link(url: str) -> str:
+    """
+    Follow the redirect of a share short link (vm.tiktok.com, fb.watch, ...) to the real URL.
+
+    Returns the original URL if the link is not a short link or cannot be resolved.
+    """
+    if not is_short_link(url):
+        return url
+    try:
+        response = requests.head(url, allow_redirects=True, timeout=SHORT_LINK_TIMEOUT)
+        return response.url or url
+    except requests.RequestException as e:
+        logger.warning(f"Could not resolve short link {url}: {e}")
+        return url
+
+
+def normalize_website_url(url: str) -> str:
+    """
+    Normalize a website URL: no scheme, no www, no fragment, no tracking params, sorted query.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[len('www.'):]
+    path = re.sub(r'/{2,}', '/', parts.path or '/')
+    if len(path) > 1:
+        path = path.rstrip('/')
+    ignored = TRACKING_PARAMS | {'ref'} if any(_is_host(host, domain) for domain in REF_TRACKING_DOMAINS) else TRACKING_PARAMS
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=False)
+        if key.lower() not in ignored and not key.lower().startswith('utm_')
+    )
+    normalized = f'{host}{path}'
+    if query:
+        normalized = f'{normalized}?{urlencode(query)}'
+    return normalized
+
+
+def canonicalize_origin(url: str, resolve_short_links: bool = True) -> str:
+    """
+    Resolve a submitted recipe link to a stable key that identifies its content.
+
+    Args:
+        url: The link submitted by the user.
+        resolve_short_links: Follow the redirect of share short links before parsing. This sends a
+            blocking HEAD request: web requests pass False and leave it to the worker.
+
+    Returns:
+        str: `tiktok:<video id>`, `youtube:<video id>`, `instagram:<shortcode>`, `x:<tweet id>`,
+        `facebook:<video id>` or `website:<normalized url>`.
+    """
+    url = (url or '').strip()
+    if not url:
+        return url
+    if '://' not in url:
+        url = f'https://{url}'
+    if resolve_short_links:
+        url = resolve_short_link(url)
+
+    parts = urlsplit(url)
+    host = _host(parts)
+    path = parts.path
+    query = dict(parse_qsl(parts.query))
+
+    if _is_host(host, 'tiktok.com'):
+        match = TIKTOK_ID_REGEX.search(path)
+        if match:
+            return f'tiktok:{match.group(1)}'
+        if query.get('item_id', '').isdigit():
+            return f"tiktok:{query['item_id']}"
+    elif _is_host(host, 'youtube.com') or host == 'youtu.be':
+        match = YOUTUBE_ID_REGEX.search(f'{host}{path}?{parts.query}')
+        if match:
+            return f'youtube:{match.group(1)}'
+    elif _is_host(host, 'instagram.com'):
+        match = INSTAGRAM_CODE_REGEX.search(path)
+        if match:
+            return f'instagram:{match.group(1)}'
+    elif _is_host(host, 'x.com') or _is_host(host, 'twitter.com'):
+        match = TWEET_ID_REGEX.search(path)
+        if match:
+            return f'x:{match.group(1)}'
+    elif _is_host(host, 'facebook.com'):
+        match = FACEBOOK_ID_REGEX.search(path)
+        if match:
+            return f'facebook:{match.group(1)}'
+        for key in FACEBOOK_QUERY_ID_KEYS:
+            if query.get(key, '').isdigit():
+                return f'facebook:{query[key]}'
+
+    return f'website:{normalize_website_url(url)}'[:255]
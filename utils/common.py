@@ -3,6 +3,7 @@ from __future__ import annotations
 import logging
 import os
 import re
+import time
 import uuid
 from pathlib import Path
 
@@ -10,12 +11,19 @@ import ffmpeg
 import requests
 from pydub import AudioSegment
 from yt_dlp import YoutubeDL
+from utils.media_info import probe_media
 from utils.settings import BASE_DIR
+from utils.task_metrics import increment_metric
+from utils.task_metrics import record_metric
 from pytube import YouTube
 
 
 DOWNLOAD_FOLDER = BASE_DIR / 'downloads'
 
+# Codecs that OpenCV/pydub decode and that can be stream-copied into an mp4 container
+REMUXABLE_VIDEO_CODECS = {'h264', 'hevc', 'mpeg4', 'vp9'}
+REMUXABLE_AUDIO_CODECS = {'aac', 'mp3', 'opus'}
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,12 +45,80 @@ def identify_platform(video_url):
         return 'website'
 
 
-def save_video_to_file(video_buffer):
+def can_remux_to_mp4(media_info) -> bool:
+    """
+    Check that every stream of the file can be copied into mp4 without re-encoding.
+    """
+    return (
+        bool(media_info.video_codecs)
+        and media_info.video_codecs <= REMUXABLE_VIDEO_CODECS
+        and media_info.audio_codecs <= REMUXABLE_AUDIO_CODECS
+    )
+
+
+def _run_ffmpeg(stream) -> float:
+    """
+    Run the ffmpeg command and return the CPU seconds of its own process.
+
+    The process is reaped with os.wait4, whose resource usage covers that pid only: ffmpeg processes
+    running at the same time in other threads are not counted.
     """
-    Save video from a buffer to a temporary file.
+    process = stream.run_async(overwrite_output=True)
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise ffmpeg.Error('ffmpeg', None, None)
+    return usage.ru_utime + usage.ru_stime
+
+
+def prepare_video_container(input_video_path, output_video_path) -> str:
+    """
+    Write the video as an mp4 that OpenCV and pydub can read.
+
+    The streams are copied as they are (remux) when their codecs are already decodable,
+    and transcoded to h264 only when they are not.
+
+    Returns:
+        str: 'remux' or 'transcode', the path that was taken.
+    """
+    start = time.perf_counter()
+    cpu_seconds = 0.0
+    mode = 'transcode'
+    media_info = probe_media(input_video_path)
+    try:
+        if media_info and can_remux_to_mp4(media_info):
+            cpu_seconds += _run_ffmpeg(
+                ffmpeg
+                .input(str(input_video_path))
+                .output(str(output_video_path), format='mp4', c='copy', movflags='+faststart')
+            )
+            mode = 'remux'
+    except ffmpeg.Error as e:
+        logger.info(f"Remux not possible, falling back to transcode: {e}")
+
+    if mode == 'transcode':
+        cpu_seconds += _run_ffmpeg(
+            ffmpeg
+            .input(str(input_video_path))
+            .output(str(output_video_path), format='mp4', vcodec='libx264', preset='fast')
+        )
+
+    elapsed = round(time.perf_counter() - start, 3)
+    cpu_seconds = round(cpu_seconds, 3)
+    logger.info(f"Video container prepared by {mode} in {elapsed}s ({cpu_seconds}s ffmpeg CPU)")
+    record_metric('video.container_mode', mode)
+    record_metric('video.container_seconds', elapsed)
+    record_metric('video.container_cpu_seconds', cpu_seconds)
+    increment_metric(f'video.{mode}_count')
+    return mode
+
+
+def save_video_to_file(video_source):
+    """
+    Save video from a buffer or a downloaded file to a temporary mp4 file.
 
     Args:
-        video_buffer: The buffer containing the video data.
+        video_source: The buffer containing the video data, or the path of a downloaded file.
 
     Returns:
         The path to the saved video file, or None if an error occurs.
@@ -50,20 +126,23 @@ def save_video_to_file(video_buffer):
 
     temp_video_path = os.path.join(DOWNLOAD_FOLDER, F"{uuid.uuid4()}.mp4")
     logger.info(temp_video_path)
+    buffer_path = None
     try:
-        # Process the video buffer and save it to a file
-        process = (
-            ffmpeg
-            .input('pipe:0')  # Input from stdin (the video buffer)
-            .output(temp_video_path, format='mp4', vcodec='libx264', preset='fast')  # Video specs
-            .run(input=video_buffer)  # Pass the buffer as input
-        )
-        logger.info(f"{process}")
+        if isinstance(video_source, (bytes, bytearray)):
+            # The codecs are probed from a file, so write the buffer down first
+            buffer_path = os.path.join(DOWNLOAD_FOLDER, F"{uuid.uuid4()}.part")
+            with open(buffer_path, 'wb') as buffer_file:
+                buffer_file.write(video_source)
+            video_source = buffer_path
+        prepare_video_container(video_source, temp_video_path)
         logger.info(f"Video saved successfully to: {temp_video_path}")
         return temp_video_path
     except ffmpeg.Error as e:
         logger.info(f"Error during video saving: {e}")
         return None
+    finally:
+        if buffer_path and os.path.exists(buffer_path):
+            os.remove(buffer_path)
 
 
 def is_audio_valid_pydub(audio_path):
@@ -87,8 +166,8 @@ def convert_video_to_mp4(input_video_path: str) -> None:
     try:
         output_video_path: str = change_extension_files(input_video_path, new_extension='vide_.mp4')
         print(f"Conversion de {input_video_path} en MP4...")
-        ffmpeg.input(input_video_path).output(output_video_path).run()
-        print(f"Conversion terminée : {output_video_path}")
+        mode = prepare_video_container(input_video_path, output_video_path)
+        print(f"Conversion terminée ({mode}) : {output_video_path}")
         #     deletete the old file
 
         os.rename(output_video_path, input_video_path)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import uuid
+
+import requests
+
+from utils.settings import BASE_DIR
+
+DOWNLOAD_FOLDER = BASE_DIR / 'downloads'
+MAX_VIDEO_DOWNLOAD_BYTES = int(os.getenv('MAX_VIDEO_DOWNLOAD_MB', 100)) * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DOWNLOAD_TIMEOUT = (10, 60)  # (connect, read) in seconds
+MAX_DOWNLOAD_RESUMES = 3
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadTooLargeError(Exception):
+    pass
+
+
+class IncompleteDownloadError(Exception):
+    pass
+
+
+def _expected_size(response, offset: int) -> int | None:
+    """
+    Total size of the file, from Content-Range on a partial response or Content-Length otherwise.
+    """
+    content_range = response.headers.get('Content-Range')
+    if content_range:
+        match = re.search(r'/(\d+)$', content_range)
+        if match:
+            return int(match.group(1))
+    content_length = response.headers.get('Content-Length')
+    if content_length and content_length.isdigit():
+        return offset + int(content_length)
+    return None
+
+
+def stream_download(url, destination=None, max_bytes: int = MAX_VIDEO_DOWNLOAD_BYTES, headers=None,
+                    proxies=None, cookies=None, max_resumes: int = MAX_DOWNLOAD_RESUMES) -> str:
+    """
+    Download a file chunk by chunk to a scratch file, without buffering it in memory.
+
+    Interrupted transfers are resumed with an HTTP Range request when the server supports it.
+
+    Args:
+        url: The URL of the file to download.
+        destination: Where to write the file (a scratch file in the download folder by default).
+        max_bytes: Reject the file as soon as it is known to be larger than this.
+        headers, proxies, cookies: Passed to requests.
+        max_resumes: How many times an interrupted transfer is resumed.
+
+    Returns:
+        str: The path of the downloaded file.
+
+    Raises:
+        DownloadTooLargeError: The file is larger than `max_bytes`.
+    """
+    os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
+    destination = str(destination or DOWNLOAD_FOLDER / f'{uuid.uuid4()}.part')
+    downloaded = 0
+    resumes = 0
+
+    while True:
+        request_headers = dict(headers or {})
+        if downloaded:
+            request_headers['Range'] = f'bytes={downloaded}-'
+        try:
+            with requests.get(url, stream=True, headers=request_headers, proxies=proxies, cookies=cookies,
+                              timeout=DOWNLOAD_TIMEOUT) as response:
+                response.raise_for_status()
+                if downloaded and response.status_code != 206:
+                    logger.info('Server does not support range requests, restarting the download.')
+                    downloaded = 0
+
+                expected_size = _expected_size(response, downloaded)
+                if expected_size and expected_size > max_bytes:
+                    raise DownloadTooLargeError(f'{expected_size} bytes announced, limit is {max_bytes} bytes')
+
+                with open(destination, 'ab' if downloaded else 'wb') as file:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        downloaded += len(chunk)
+                        if downloaded > max_bytes:
+                            raise DownloadTooLargeError(f'more than {max_bytes} bytes received')
+                        file.write(chunk)
+
+                if expected_size and downloaded < expected_size:
+                    raise IncompleteDownloadError(f'{downloaded}/{expected_size} bytes received')
+
+            logger.info(f"Downloaded {downloaded} bytes to {destination}")
+            return destination
+        except DownloadTooLargeError:
+            remove_scratch_file(destination)
+            raise
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                IncompleteDownloadError) as e:
+            resumes += 1
+            if resumes > max_resumes:
+                remove_scratch_file(destination)
+                raise
+            logger.warning(f"Download interrupted at {downloaded} bytes ({e}), resuming ({resumes}/{max_resumes})...")
+        except Exception:
+            remove_scratch_file(destination)
+            raise
+
+
+def remove_scratch_file(file_path):
+    if file_path and os.path.exists(file_path):
+        os.remove(file_path)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import importlib.util
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# 'auto' uses lxml when it is installed, the pure-Python html.parser otherwise
+HTML_PARSER = os.getenv('HTML_PARSER', 'auto')
+PARSER_BACKENDS = ('lxml', 'html.parser')
+
+
+def available_parsers() -> list[str]:
+    return [backend for backend in PARSER_BACKENDS if backend == 'html.parser' or importlib.util.find_spec(backend)]
+
+
+@lru_cache(maxsize=None)
+def resolve_parser(name: str = None) -> str:
+    """
+    The BeautifulSoup tree builder to use for `name` (or HTML_PARSER), falling back to html.parser.
+    """
+    name = name or HTML_PARSER
+    available = available_parsers()
+    if name == 'auto':
+        return available[0]
+    if name not in available:
+        logger.warning(f"HTML parser {name} is not available, using html.parser")
+        return 'html.parser'
+    return name
+
+
+def parse_html(markup: str | bytes, parser: str = None) -> BeautifulSoup:
+    """
+    Parse a full page for DOM work with the fastest available backend.
+    """
+    return BeautifulSoup(markup, resolve_parser(parser))
+
+
+@lru_cache(maxsize=32)
+def _script_tag_regex(script_id: str, binary: bool) -> re.Pattern:
+    pattern = r'<script\b[^>]*?\sid\s*=\s*(["\']?)' + re.escape(script_id) + r'\1[\s/>]'
+    if binary:
+        return re.compile(pattern.encode(), re.IGNORECASE)
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def extract_script_json(markup: str | bytes, script_id: str):
+    """
+    Load the JSON payload of the `<script id=...>` tag without parsing the page.
+
+    The raw markup (bytes preferably, to skip decoding the whole page) is scanned for the
+    opening tag and the payload is cut at the next closing script tag.
+
+    Returns:
+        The decoded JSON, or None if the page has no such script tag.
+    """
+    binary = isinstance(markup, (bytes, bytearray))
+    match = _script_tag_regex(script_id, binary).search(markup)
+    if not match:
+        return None
+    start = markup.index(b'>' if binary else '>', match.end() - 1) + 1
+    end = markup.find(b'</script' if binary else '</script', start)
+    if end == -1:
+        return None
+    return json.loads(markup[start:end])
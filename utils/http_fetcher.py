@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.task_metrics import increment_metric
+from utils.task_metrics import record_metric
+
+logger = logging.getLogger(__name__)
+
+FETCH_CONNECT_TIMEOUT = float(os.getenv('FETCH_CONNECT_TIMEOUT', 5))
+FETCH_READ_TIMEOUT = float(os.getenv('FETCH_READ_TIMEOUT', 20))
+FETCH_DEADLINE_SECONDS = float(os.getenv('FETCH_DEADLINE_SECONDS', 90))
+FETCH_MAX_ATTEMPTS = int(os.getenv('FETCH_MAX_ATTEMPTS', 2))
+# Politeness: requests per second to one domain, and the burst allowed above it
+FETCH_DOMAIN_RATE = float(os.getenv('FETCH_DOMAIN_RATE', 1))
+FETCH_DOMAIN_BURST = int(os.getenv('FETCH_DOMAIN_BURST', 3))
+FETCH_POOL_SIZE = int(os.getenv('FETCH_POOL_SIZE', 10))
+FETCH_BACKOFF_BASE = 0.5
+FETCH_BACKOFF_MAX = 4.0
+
+SCRAPENINJA_URL = 'https://scrapeninja.p.rapidapi.com/scrape'
+# The ScrapeNinja strategy is skipped when no key is configured
+SCRAPENINJA_API_KEY = os.getenv('SCRAPENINJA_API_KEY')
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.150 Safari/537.36",
+]
+# Blocked or throttled: another strategy may get through
+NEXT_STRATEGY_STATUSES = {401, 403, 429}
+# The page does not exist, no strategy will find it
+FINAL_STATUSES = {404, 410}
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    The keep-alive session of the worker process, rebuilt after a fork. Retries are handled by fetch_page.
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=FETCH_POOL_SIZE, pool_maxsize=FETCH_POOL_SIZE, max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+
+class TokenBucket:
+    """
+    Allow `rate` requests per second with bursts of `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float = None) -> float | None:
+        """
+        Take a token and return how long to wait before using it, or None without taking it when the
+        wait would exceed `max_wait`.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if max_wait is not None and wait >= max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+def _domain_bucket(url: str) -> TokenBucket:
+    domain = (urlsplit(url).hostname or '').lower()
+    with _buckets_lock:
+        if domain not in _buckets:
+            _buckets[domain] = TokenBucket(FETCH_DOMAIN_RATE, FETCH_DOMAIN_BURST)
+        return _buckets[domain]
+
+
+@dataclass
+class FetchAttempt:
+    strategy: str
+    status_code: int | None
+    error: str | None
+    seconds: float
+
+
+@dataclass
+class FetchReport:
+    """
+    Which strategy fetched the page, and every attempt made on the way.
+    """
+    url: str
+    strategy: str | None = None
+    attempts: list[FetchAttempt] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'url': self.url,
+            'strategy': self.strategy,
+            'seconds': round(self.seconds, 3),
+            'attempts': [attempt.__dict__ for attempt in self.attempts],
+        }
+
+
+def _residential_proxies() -> dict | None:
+    host = os.getenv("RESIDENTIAL_PROXY_HOST")
+    if not host:
+        return None
+    port = os.getenv("RESIDENTIAL_PROXY_PORT")
+    username = os.getenv("RESIDENTIAL_PROXY_USERNAME")
+    password = os.getenv("RESIDENTIAL_PROXY_PASSWORD")
+    return {'https': f'http://customer-{username}:{password}@{host}:{port}'}
+
+
+def _direct(url: str, timeout, headers: dict) -> requests.Response:
+    return get_session().get(url, headers={'User-Agent': random.choice(USER_AGENTS), **headers}, timeout=timeout)
+
+
+def _proxy(url: str, timeout, headers: dict) -> requests.Response:
+    return get_session().get(url, headers={'User-Agent': random.choice(USER_AGENTS), **headers},
+                             proxies=_residential_proxies(), timeout=timeout)
+
+
+def _scrapeninja(url: str, timeout, headers: dict) -> requests.Response:
+    # The API fetches the page itself: request headers are not forwarded
+    headers = {
+        'x-rapidapi-key': SCRAPENINJA_API_KEY,
+        'x-rapidapi-host': 'scrapeninja.p.rapidapi.com'
+    }
+    return get_session().get(SCRAPENINJA_URL, headers=headers, params={'url': url}, timeout=timeout)
+
+
+def fetch_strategies() -> list[tuple]:
+    """
+    (name, fetch function, whether it is rate limited per target domain), in the order they are tried.
+    """
+    strategies = [('direct', _direct, True)]
+    if _residential_proxies():
+        strategies.append(('proxy', _proxy, True))
+    if SCRAPENINJA_API_KEY:
+        strategies.append(('scrapeninja', _scrapeninja, False))
+    return strategies
+
+
+def _backoff_delay(attempt: int, response: requests.Response | None) -> float:
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    try:
+        if retry_after:
+            return min(float(retry_after), FETCH_BACKOFF_MAX)
+    except ValueError:
+        pass
+    return min(FETCH_BACKOFF_MAX, FETCH_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def fetch_page(url: str, headers: dict = None,
+               deadline_seconds: float = None) -> tuple[requests.Response | None, FetchReport]:
+    """
+    Fetch a page, trying each configured strategy (direct, residential proxy, ScrapeNinja) in turn.
+
+    `headers` are added to the direct and proxy requests (conditional request validators); a 304 Not
+    Modified answer to them counts as a success.
+
+    A strategy is retried with jittered backoff on timeouts, connection errors and 5xx responses, up to
+    FETCH_MAX_ATTEMPTS times; a blocked response (403, 429...) moves on to the next strategy at once.
+    Every wait and timeout is cut to the deadline, which bounds the whole fetch.
+
+    Returns:
+        tuple: (the successful response or None, FetchReport)
+    """
+    report = FetchReport(url=url)
+    start = time.monotonic()
+    deadline = start + (deadline_seconds or FETCH_DEADLINE_SECONDS)
+
+    def remaining() -> float:
+        return deadline - time.monotonic()
+
+    for name, fetch, rate_limited in fetch_strategies():
+        for attempt in range(FETCH_MAX_ATTEMPTS):
+            # The token is only taken when the request can be sent before the deadline
+            wait = _domain_bucket(url).reserve(max_wait=remaining()) if rate_limited else 0.0
+            if wait is None or remaining() <= 0:
+                break
+            time.sleep(wait)
+
+            attempt_start = time.monotonic()
+            response, error = None, None
+            try:
+                increment_metric('fetch.requests')
+                timeout = (FETCH_CONNECT_TIMEOUT, max(0.1, min(FETCH_READ_TIMEOUT, remaining())))
+                response = fetch(url, timeout, headers or {})
+                response.raise_for_status()
+            except requests.RequestException as e:
+                error = f'{type(e).__name__}: {e}'
+            status_code = response.status_code if response is not None else None
+            report.attempts.append(FetchAttempt(name, status_code, error, round(time.monotonic() - attempt_start, 3)))
+
+            if error is None:
+                report.strategy = name
+                return _finish(report, start, response)
+            if status_code in FINAL_STATUSES:
+                return _finish(report, start, None)
+            if status_code in NEXT_STRATEGY_STATUSES:
+                break
+            delay = _backoff_delay(attempt, response)
+            if attempt + 1 < FETCH_MAX_ATTEMPTS and delay < remaining():
+                time.sleep(delay)
+        if remaining() <= 0:
+            break
+    return _finish(report, start, None)
+
+
+def _finish(report: FetchReport, start: float, response: requests.Response | None):
+    report.seconds = time.monotonic() - start
+    record_metric('fetch.strategy', report.strategy or 'failed')
+    record_metric('fetch.seconds', round(report.seconds, 3))
+    if report.strategy:
+        logger.info(f"Fetched {report.url} with {report.strategy} in {report.seconds:.2f}s "
+                    f"({len(report.attempts)} attempts)")
+    else:
+        logger.warning(f"Could not fetch {report.url}: {report.to_dict()}")
+    return response, report
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from fractions import Fraction
+
+logger = logging.getLogger(__name__)
+
+UNICODE_FRACTIONS = {
+    '½': Fraction(1, 2), '⅓': Fraction(1, 3), '⅔': Fraction(2, 3), '¼': Fraction(1, 4), '¾': Fraction(3, 4),
+    '⅕': Fraction(1, 5), '⅖': Fraction(2, 5), '⅗': Fraction(3, 5), '⅘': Fraction(4, 5), '⅙': Fraction(1, 6),
+    '⅚': Fraction(5, 6), '⅛': Fraction(1, 8), '⅜': Fraction(3, 8), '⅝': Fraction(5, 8), '⅞': Fraction(7, 8),
+}
+_fraction_chars = ''.join(UNICODE_FRACTIONS)
+
+# Mixed numbers first, so "1 1/2" is one token and not "1" then "1/2"
+NUMBER_REGEX = re.compile(
+    rf'\d+\s+\d+/\d+|\d+\s*[{_fraction_chars}]|\d+/\d+|\d+(?:\.\d+)?|[{_fraction_chars}]'
+)
+RANGE_REGEX = re.compile(r'\s*(?:-|–|—|to|or)\s*', re.IGNORECASE)
+UNIT_REGEX = re.compile(r'\s*(fl\.?\s*oz\.?|fluid\s+ounces?|[a-zA-Z]+\.?)')
+BULLET_REGEX = re.compile(r'[\s\-*•·]*')
+NUMBER_WORD_REGEX = re.compile(r'(a|an|one|two|three|four|five|six|half|dozen)\s+', re.IGNORECASE)
+PARENTHESIS_REGEX = re.compile(r'\s*\(([^)]*)\)')
+
+NUMBER_WORDS = {
+    'a': Fraction(1), 'an': Fraction(1), 'one': Fraction(1), 'two': Fraction(2), 'three': Fraction(3),
+    'four': Fraction(4), 'five': Fraction(5), 'six': Fraction(6), 'half': Fraction(1, 2), 'dozen': Fraction(12),
+}
+
+# Canonical unit -> accepted spellings (matched case-insensitively, except 'T' and 't')
+_UNIT_SPELLINGS = {
+    'g': ('g', 'gr', 'gram', 'grams', 'gramme', 'grammes'),
+    'kg': ('kg', 'kgs', 'kilogram', 'kilograms', 'kilo', 'kilos'),
+    'mg': ('mg', 'milligram', 'milligrams'),
+    'oz': ('oz', 'ounce', 'ounces'),
+    'lb': ('lb', 'lbs', 'pound', 'pounds'),
+    'ml': ('ml', 'milliliter', 'milliliters', 'millilitre', 'millilitres', 'cc'),
+    'cl': ('cl', 'centiliter', 'centiliters', 'centilitre', 'centilitres'),
+    'dl': ('dl', 'deciliter', 'deciliters', 'decilitre', 'decilitres'),
+    'l': ('l', 'liter', 'liters', 'litre', 'litres'),
+    'tsp': ('tsp', 'tsps', 'teaspoon', 'teaspoons', 'tspn'),
+    'tbsp': ('tbsp', 'tbsps', 'tbs', 'tbl', 'tablespoon', 'tablespoons', 'tblsp'),
+    'cup': ('cup', 'cups', 'c'),
+    'fl oz': ('fl oz', 'floz', 'fluid ounce', 'fluid ounces'),
+    'pint': ('pint', 'pints', 'pt'),
+    'quart': ('quart', 'quarts', 'qt'),
+    'gallon': ('gallon', 'gallons', 'gal'),
+    'pinch': ('pinch', 'pinches'),
+    'dash': ('dash', 'dashes'),
+    'clove': ('clove', 'cloves'),
+    'can': ('can', 'cans', 'tin', 'tins'),
+    'jar': ('jar', 'jars'),
+    'package': ('package', 'packages', 'pack', 'packs', 'packet', 'packets', 'pkg'),
+    'slice': ('slice', 'slices'),
+    'piece': ('piece', 'pieces', 'pc', 'pcs'),
+    'stick': ('stick', 'sticks'),
+    'bunch': ('bunch', 'bunches'),
+    'handful': ('handful', 'handfuls'),
+    'sprig': ('sprig', 'sprigs'),
+    'stalk': ('stalk', 'stalks', 'rib', 'ribs'),
+    'head': ('head', 'heads'),
+    'fillet': ('fillet', 'fillets', 'filet', 'filets'),
+}
+UNIT_ALIASES = {spelling: unit for unit, spellings in _UNIT_SPELLINGS.items() for spelling in spellings}
+MASS_UNITS = {'g', 'kg', 'mg', 'oz', 'lb'}
+VOLUME_UNITS = {'ml', 'cl', 'dl', 'l', 'tsp', 'tbsp', 'cup', 'fl oz', 'pint', 'quart', 'gallon', 'pinch', 'dash'}
+CONTAINER_UNITS = {'can', 'jar', 'package'}
+
+
+def parse_number(token: str) -> Fraction | None:
+    """
+    Value of a numeric token: "2", "1.5", "3/4", "1 1/2", "1½" or "½".
+
+    Returns None for a fraction with a zero denominator ("1/0"), which is not a number.
+    """
+    token = token.strip()
+    if token[-1] in UNICODE_FRACTIONS:
+        whole = token[:-1].strip()
+        return (Fraction(int(whole)) if whole else Fraction(0)) + UNICODE_FRACTIONS[token[-1]]
+    try:
+        if ' ' in token:
+            whole, fraction = token.split()
+            return Fraction(int(whole)) + Fraction(fraction)
+        return Fraction(token)
+    except ZeroDivisionError:
+        return None
+
+
+def _number_spans(text: str) -> tuple[NumberSpan, ...]:
+    spans = []
+    for match in NUMBER_REGEX.finditer(text):
+        value = parse_number(match.group())
+        if value is not None:
+            spans.append(NumberSpan(match.start(), match.end(), value))
+    return tuple(spans)
+
+
+@dataclass(frozen=True)
+class NumberSpan:
+    """
+    A numeric token of the ingredient line and its position in the text.
+    """
+    start: int
+    end: int
+    value: Fraction
+
+    def to_dict(self) -> dict:
+        return {'start': self.start, 'end': self.end, 'value': str(self.value)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> NumberSpan:
+        return cls(start=data['start'], end=data['end'], value=Fraction(data['value']))
+
+
+@dataclass(frozen=True)
+class ParsedIngredient:
+    text: str
+    quantity: Fraction | None
+    quantity_max: Fraction | None
+    unit: str | None
+    name: str
+    name_span: tuple[int, int] | None
+    numbers: tuple[NumberSpan, ...]
+
+    @property
+    def mean_quantity(self) -> Fraction | None:
+        if self.quantity is None or self.quantity_max is None:
+            return self.quantity
+        return (self.quantity + self.quantity_max) / 2
+
+    def to_dict(self) -> dict:
+        return {
+            'text': self.text,
+            'quantity': str(self.quantity) if self.quantity is not None else None,
+            'quantity_max': str(self.quantity_max) if self.quantity_max is not None else None,
+            'unit': self.unit,
+            'name': self.name,
+            'name_span': list(self.name_span) if self.name_span else None,
+            'numbers': [number.to_dict() for number in self.numbers],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> ParsedIngredient:
+        return cls(
+            text=data['text'],
+            quantity=Fraction(data['quantity']) if data.get('quantity') is not None else None,
+            quantity_max=Fraction(data['quantity_max']) if data.get('quantity_max') is not None else None,
+            unit=data.get('unit'),
+            name=data.get('name', ''),
+            name_span=tuple(data['name_span']) if data.get('name_span') else None,
+            numbers=tuple(NumberSpan.from_dict(number) for number in data.get('numbers', [])),
+        )
+
+
+def _read_unit(text: str, position: int) -> tuple[str | None, int]:
+    match = UNIT_REGEX.match(text, position)
+    if not match:
+        return None, position
+    word = match.group(1)
+    # The case of "T" (tablespoon) and "t" (teaspoon) is significant
+    if word.rstrip('.') in ('T', 't'):
+        return ('tbsp' if word.startswith('T') else 'tsp'), match.end()
+    spelling = re.sub(r'\s+', ' ', word.lower().rstrip('.')).replace('fl. oz', 'fl oz')
+    unit = UNIT_ALIASES.get(spelling)
+    if unit is None:
+        return None, position
+    # A unit glued to a word ("cups" in "cupsugar") is not a unit
+    if match.end() < len(text) and text[match.end()].isalpha():
+        return None, position
+    return unit, match.end()
+
+
+def _size_amount(inner: str):
+    """
+    The mass or volume amount written in parentheses ("14 oz"), or None.
+    """
+    inner_numbers = _number_spans(inner)
+    inner_amount = _read_amount(inner, 0, inner_numbers) if inner_numbers else None
+    if inner_amount and inner_amount[2] in MASS_UNITS | VOLUME_UNITS:
+        return inner_amount
+    return None
+
+
+def _read_amount(text: str, position: int, numbers):
+    """
+    Read "<quantity>[ - <quantity>][ (<size>)][ <unit>]" at `position`.
+
+    Returns:
+        tuple: (quantity, quantity_max, unit, end position), or None if no quantity starts there.
+    """
+    number = next((number for number in numbers if number.start == position), None)
+    quantity_max = None
+    if number is not None:
+        quantity = number.value
+        position = number.end
+        range_match = RANGE_REGEX.match(text, position)
+        if range_match:
+            upper = next((n for n in numbers if n.start == range_match.end()), None)
+            if upper is not None:
+                quantity_max = upper.value
+                position = upper.end
+    else:
+        word_match = NUMBER_WORD_REGEX.match(text, position)
+        if not word_match:
+            return None
+        quantity = NUMBER_WORDS[word_match.group(1).lower()]
+        position = word_match.end()
+        if word_match.group(1).lower() in ('a', 'an') and _read_unit(text, position)[0] is None:
+            return None
+
+    # "1 (14 oz) can": the container size in parentheses gives the real amount
+    size = None
+    parenthesis = PARENTHESIS_REGEX.match(text, position)
+    if parenthesis:
+        inner = parenthesis.group(1)
+        size = _size_amount(parenthesis.group(1))
+        position = parenthesis.end()
+
+    unit, position = _read_unit(text, position)
+    # "1 cup (240 ml) milk", "1 can (14 oz) tomatoes": an equivalent or a container size after the unit
+    parenthesis = PARENTHESIS_REGEX.match(text, position) if unit else None
+    if parenthesis:
+        if size is None and unit in CONTAINER_UNITS:
+            size = _size_amount(parenthesis.group(1))
+        position = parenthesis.end()
+    if size and unit in CONTAINER_UNITS | {None}:
+        quantity = quantity * size[0]
+        quantity_max = quantity_max * size[0] if quantity_max is not None else None
+        unit = size[2]
+    of_match = re.match(r'\s+of\b', text[position:], re.IGNORECASE)
+    if of_match:
+        position += of_match.end()
+    return quantity, quantity_max, unit, position
+
+
+def _name_span(text: str, start: int, end: int) -> tuple[int, int] | None:
+    """
+    Span of the ingredient name in text[start:end], without preparation notes and parentheses.
+    """
+    segment = text[start:end]
+    cut = len(segment)
+    for separator in (',', '(', ';', ' - ', ' – '):
+        index = segment.find(separator)
+        if index > 0:
+            cut = min(cut, index)
+    to_taste = re.search(r'\s+(?:to taste|as needed|for garnish|optional)\b', segment[:cut], re.IGNORECASE)
+    if to_taste:
+        cut = to_taste.start()
+    name = segment[:cut]
+    stripped = name.strip(' .:-*')
+    if not stripped:
+        return None
+    offset = start + name.index(stripped)
+    return offset, offset + len(stripped)
+
+
+def parse_ingredient(text: str) -> ParsedIngredient:
+    """
+    Split an ingredient line into quantity, unit and ingredient name.
+
+    Handles integers, decimals, fractions, mixed numbers, unicode fractions, ranges ("2-3"),
+    container sizes ("1 (14 oz) can", "1 can (14 oz)"), equivalents after the unit
+    ("1 cup (240 ml)") and "Name: amount" lines. Every numeric token of the
+    line is kept with its position, so quantities can be rewritten in place.
+    """
+    text = text or ''
+    numbers = _number_spans(text)
+    start = BULLET_REGEX.match(text).end()
+
+    quantity = quantity_max = unit = None
+    amount = _read_amount(text, start, numbers)
+    if amount:
+        quantity, quantity_max, unit, name_start = amount
+        span = _name_span(text, name_start, len(text))
+    elif ':' in text:
+        colon = text.index(':')
+        amount_start = colon + 1 + len(text[colon + 1:]) - len(text[colon + 1:].lstrip())
+        amount = _read_amount(text, amount_start, numbers)
+        if amount:
+            quantity, quantity_max, unit, _ = amount
+        span = _name_span(text, start, colon)
+    else:
+        span = _name_span(text, start, len(text))
+
+    return ParsedIngredient(
+        text=text,
+        quantity=quantity,
+        quantity_max=quantity_max,
+        unit=unit,
+        name=text[span[0]:span[1]] if span else '',
+        name_span=span,
+        numbers=numbers,
+    )
+
+
+def parse_ingredient_groups(ingredients) -> list[dict]:
+    """
+    Parse every line of the `Recipe.ingredients` groups, keeping the group structure.
+
+    Returns:
+        list: [{'title_of_ingredient': str, 'list': [ParsedIngredient.to_dict(), ...]}, ...]
+    """
+    return [
+        {
+            'title_of_ingredient': group.get('title_of_ingredient'),
+            'list': [_parse_line(line).to_dict() for line in group.get('list') or [] if isinstance(line, str)],
+        }
+        for group in ingredients or [] if isinstance(group, dict)
+    ]
+
+
+def _parse_line(text: str) -> ParsedIngredient:
+    """
+    parse_ingredient, degraded to an unparsed line (no quantity, no numbers) if the line cannot be read,
+    so one bad line never stops a recipe from being stored.
+    """
+    try:
+        return parse_ingredient(text)
+    except Exception as e:
+        logger.warning(f"Could not parse ingredient line {text!r}: {e}")
+        return ParsedIngredient(text=text, quantity=None, quantity_max=None, unit=None, name=text.strip(),
+                                name_span=None, numbers=())
+
+
+def normalize_ingredient_name(name: str) -> str:
+    """
+    Lowercase the name and keep only its words, for lookups.
+    """
+    return ' '.join(re.findall(r'[a-z]+', (name or '').lower().replace('-', ' ')))
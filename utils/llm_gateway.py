@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+
+import httpx
+from openai import APIConnectionError
+from openai import APIStatusError
+from openai import OpenAI
+
+from utils.task_metrics import increment_metric
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 8))
+LLM_DEADLINE_SECONDS = float(os.getenv('LLM_DEADLINE_SECONDS', 180))
+LLM_MAX_ATTEMPTS = int(os.getenv('LLM_MAX_ATTEMPTS', 4))
+LLM_CONNECT_TIMEOUT = 10
+LLM_BACKOFF_BASE = 1.0
+LLM_BACKOFF_MAX = 30.0
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+# Process-wide cap on the calls in flight, shared by the sync and the asyncio interfaces
+_semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+
+class LLMDeadlineExceeded(Exception):
+    pass
+
+
+def get_client() -> OpenAI:
+    """
+    The OpenAI client of the worker process, with a pooled keep-alive HTTP client.
+
+    The client is rebuilt after a fork so Celery children never share connections.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=LLM_MAX_CONCURRENCY * 2,
+                                    max_keepalive_connections=LLM_MAX_CONCURRENCY),
+                timeout=httpx.Timeout(LLM_DEADLINE_SECONDS, connect=LLM_CONNECT_TIMEOUT),
+            )
+            _client = OpenAI(
+                api_key=os.environ.get('OPENAI_API_KEY'),
+                organization=os.environ.get('OPENAI_ORGANIZATION'),
+                http_client=http_client,
+                max_retries=0,  # retries are handled here, with backoff and a deadline
+            )
+            _client_pid = os.getpid()
+        return _client
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, APIConnectionError):  # includes timeouts
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _backoff_delay(attempt: int, error: Exception) -> float:
+    retry_after = None
+    if isinstance(error, APIStatusError):
+        retry_after = error.response.headers.get('retry-after')
+    try:
+        if retry_after:
+            return min(float(retry_after), LLM_BACKOFF_MAX)
+    except ValueError:
+        pass
+    return min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def call_with_retries(request, deadline: float = None, name: str = 'llm'):
+    """
+    Run `request(timeout)` under the concurrency limit, retrying 429/5xx/connection errors
+    with jittered exponential backoff until the deadline.
+
+    Args:
+        request: Callable receiving the timeout left for the attempt, in seconds.
+        deadline: Overall budget of the call, retries and waits included, in seconds.
+        name: Label used in the logs.
+    """
+    deadline_at = time.monotonic() + (deadline or LLM_DEADLINE_SECONDS)
+    for attempt in range(LLM_MAX_ATTEMPTS):
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0 or not _semaphore.acquire(timeout=remaining):
+            raise LLMDeadlineExceeded(f"{name} call did not complete within its deadline")
+        start = time.monotonic()
+        increment_metric('llm.requests')
+        try:
+            return request(max(1.0, deadline_at - time.monotonic()))
+        except Exception as e:
+            if not _is_retryable(e) or attempt == LLM_MAX_ATTEMPTS - 1:
+                raise
+            delay = _backoff_delay(attempt, e)
+            if time.monotonic() + delay >= deadline_at:
+                raise
+            logger.warning(f"{name} call failed ({e}), retrying in {delay:.1f}s ({attempt + 1}/{LLM_MAX_ATTEMPTS - 1})")
+        finally:
+            _semaphore.release()
+            logger.info(f"{name} attempt {attempt + 1} took {time.monotonic() - start:.2f} seconds")
+        time.sleep(delay)
+
+
+def chat_completion(messages, model: str, deadline: float = None, **params):
+    """
+    Create a chat completion through the shared client.
+    """
+    return call_with_retries(
+        lambda timeout: get_client().chat.completions.create(model=model, messages=messages, timeout=timeout, **params),
+        deadline=deadline,
+        name=model,
+    )
+
+
+def transcription(audio_path, model: str = 'whisper-1', deadline: float = None, **params):
+    """
+    Transcribe an audio file through the shared client.
+    """
+    def request(timeout):
+        with open(audio_path, 'rb') as audio_file:
+            return get_client().audio.transcriptions.create(model=model, file=audio_file, timeout=timeout, **params)
+
+    return call_with_retries(request, deadline=deadline, name=model)
+
+
+async def achat_completion(messages, model: str, deadline: float = None, **params):
+    """
+    Awaitable chat_completion for asyncio callers.
+
+    This is not a native async client: the blocking call runs in a thread of the default executor
+    (asyncio.to_thread), which stays busy for the whole call, retries and backoff included. It
+    shares the pool, concurrency limit and retries of chat_completion.
+    """
+    return await asyncio.to_thread(chat_completion, messages, model, deadline, **params)
+
+
+async def atranscription(audio_path, model: str = 'whisper-1', deadline: float = None, **params):
+    """
+    Awaitable transcription for asyncio callers.
+
+    Like achat_completion, a thread of the default executor is held for the whole blocking call.
+    """
+    return await asyncio.to_thread(transcription, audio_path, model, deadline, **params)
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from fractions import Fraction
+
+import ffmpeg
+
+logger = logging.getLogger(__name__)
+
+MEDIA_INFO_CACHE_SIZE = 64
+
+
+def _to_float(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _frame_rate(value) -> float | None:
+    try:
+        rate = Fraction(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return float(rate) if rate > 0 else None
+
+
+@dataclass(frozen=True)
+class StreamInfo:
+    index: int
+    codec_type: str
+    codec_name: str | None
+    duration: float | None
+    bit_rate: int | None
+    width: int | None = None
+    height: int | None = None
+    frame_rate: float | None = None
+    frame_count: int | None = None
+    rotation: int = 0
+    sample_rate: int | None = None
+    channels: int | None = None
+
+    @classmethod
+    def from_probe(cls, stream: dict) -> StreamInfo:
+        rotation = _to_int(stream.get('tags', {}).get('rotate')) or 0
+        for side_data in stream.get('side_data_list', []):
+            if 'rotation' in side_data:
+                rotation = _to_int(side_data.get('rotation')) or 0
+        return cls(
+            index=stream.get('index', 0),
+            codec_type=stream.get('codec_type'),
+            codec_name=stream.get('codec_name'),
+            duration=_to_float(stream.get('duration')),
+            bit_rate=_to_int(stream.get('bit_rate')),
+            width=_to_int(stream.get('width')),
+            height=_to_int(stream.get('height')),
+            frame_rate=_frame_rate(stream.get('avg_frame_rate')) or _frame_rate(stream.get('r_frame_rate')),
+            frame_count=_to_int(stream.get('nb_frames')),
+            rotation=abs(rotation) % 360,
+            sample_rate=_to_int(stream.get('sample_rate')),
+            channels=_to_int(stream.get('channels')),
+        )
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    """
+    Container and stream metadata of a media file, read with a single ffprobe call.
+    """
+    path: str
+    format_name: str | None
+    duration: float | None
+    size: int | None
+    bit_rate: int | None
+    streams: tuple[StreamInfo, ...]
+
+    @classmethod
+    def from_probe(cls, path: str, probe: dict) -> MediaInfo:
+        media_format = probe.get('format', {})
+        return cls(
+            path=path,
+            format_name=media_format.get('format_name'),
+            duration=_to_float(media_format.get('duration')),
+            size=_to_int(media_format.get('size')),
+            bit_rate=_to_int(media_format.get('bit_rate')),
+            streams=tuple(StreamInfo.from_probe(stream) for stream in probe.get('streams', [])),
+        )
+
+    @property
+    def video_stream(self) -> StreamInfo | None:
+        return next((stream for stream in self.streams if stream.codec_type == 'video'), None)
+
+    @property
+    def audio_stream(self) -> StreamInfo | None:
+        return next((stream for stream in self.streams if stream.codec_type == 'audio'), None)
+
+    @property
+    def has_audio(self) -> bool:
+        audio = self.audio_stream
+        if audio is None:
+            return False
+        duration = audio.duration if audio.duration is not None else self.duration
+        return duration is None or duration > 0
+
+    @property
+    def video_codecs(self) -> set[str]:
+        return {stream.codec_name for stream in self.streams if stream.codec_type == 'video'}
+
+    @property
+    def audio_codecs(self) -> set[str]:
+        return {stream.codec_name for stream in self.streams if stream.codec_type == 'audio'}
+
+    @property
+    def frame_rate(self) -> float | None:
+        return self.video_stream.frame_rate if self.video_stream else None
+
+    @property
+    def video_duration(self) -> float | None:
+        video = self.video_stream
+        if video and video.duration:
+            return video.duration
+        return self.duration
+
+    @property
+    def frame_count(self) -> int | None:
+        video = self.video_stream
+        if video is None:
+            return None
+        if video.frame_count:
+            return video.frame_count
+        if self.frame_rate and self.video_duration:
+            return int(self.frame_rate * self.video_duration)
+        return None
+
+    @property
+    def display_size(self) -> tuple[int, int] | None:
+        """
+        Width and height of the decoded frames once the rotation metadata is applied.
+        """
+        video = self.video_stream
+        if video is None or not video.width or not video.height:
+            return None
+        if video.rotation in (90, 270):
+            return video.height, video.width
+        return video.width, video.height
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def probe_media(path) -> MediaInfo | None:
+    """
+    Probe a media file once and cache the result for as long as the file is unchanged.
+
+    Returns:
+        MediaInfo, or None if the file cannot be probed.
+    """
+    path = str(path)
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        logger.error(f"Cannot probe {path}: {e}")
+        return None
+    cache_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        if cache_key in _cache:
+            _cache.move_to_end(cache_key)
+            return _cache[cache_key]
+
+    try:
+        media_info = MediaInfo.from_probe(path, ffmpeg.probe(path))
+    except ffmpeg.Error as e:
+        logger.error(f"ffprobe failed for {path}: {e.stderr.decode(errors='ignore') if e.stderr else e}")
+        return None
+
+    with _cache_lock:
+        _cache[cache_key] = media_info
+        while len(_cache) > MEDIA_INFO_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return media_info
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+
+from utils.task_metrics import record_metric
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_MAX_WORKERS = int(os.getenv('PIPELINE_MAX_WORKERS', 2))
+
+
+class StageExecutor:
+    """
+    Run independent pipeline stages concurrently on a bounded thread pool.
+
+    Each stage is timed and its duration is recorded as the
+    `stage.<name>.seconds` metric of the running task.
+    """
+
+    def __init__(self, max_workers: int = None, name: str = 'pipeline'):
+        self.name = name
+        self.max_workers = max(1, max_workers or PIPELINE_MAX_WORKERS)
+        self.timings = {}
+        self._futures = {}
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        return False
+
+    def submit(self, stage_name: str, function, *args, **kwargs):
+        """
+        Schedule `function(*args, **kwargs)` as the stage `stage_name`.
+        """
+        context = contextvars.copy_context()
+        future = self._pool.submit(context.run, self._timed, stage_name, function, *args, **kwargs)
+        self._futures[stage_name] = future
+        return future
+
+    def result(self, stage_name: str, timeout: float = None):
+        """
+        Wait for a stage and return its result, re-raising its exception.
+        """
+        return self._futures[stage_name].result(timeout=timeout)
+
+    def gather(self, timeout: float = None, default=None) -> dict:
+        """
+        Wait for every submitted stage within a single deadline.
+
+        Stages that failed or did not finish in time get `default` as result.
+
+        Returns:
+            dict: The result of each stage keyed by stage name.
+        """
+        done, not_done = wait(self._futures.values(), timeout=timeout)
+        results = {}
+        for stage_name, future in self._futures.items():
+            if future in not_done:
+                future.cancel()
+                logger.error(f"[{self.name}] stage {stage_name} did not finish within {timeout} seconds")
+                results[stage_name] = default
+                continue
+            try:
+                results[stage_name] = future.result()
+            except Exception as e:
+                logger.error(f"[{self.name}] stage {stage_name} failed: {e}")
+                results[stage_name] = default
+        return results
+
+    def shutdown(self):
+        # Do not block the caller on stages that outlived their deadline
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        if self.timings:
+            logger.info(f"[{self.name}] stage timings: {self.timings}")
+
+    def _timed(self, stage_name, function, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = round(time.perf_counter() - start, 3)
+            self.timings[stage_name] = elapsed
+            record_metric(f'stage.{stage_name}.seconds', elapsed)
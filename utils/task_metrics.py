@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_current_metrics = contextvars.ContextVar('task_metrics', default=None)
+_lock = threading.Lock()
+
+
+@contextmanager
+def collect_task_metrics():
+    """
+    Collect the metrics recorded by the pipeline stages of the current task.
+
+    Yields:
+        dict: The metrics recorded while the context is active.
+    """
+    metrics = {}
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
+
+
+def record_metric(name, value):
+    """
+    Store a metric for the running task. Does nothing outside of a task.
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return
+    with _lock:
+        metrics[name] = value
+
+
+def increment_metric(name, amount=1):
+    """
+    Add `amount` to a counter metric of the running task.
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return
+    with _lock:
+        metrics[name] = metrics.get(name, 0) + amount